@@ -27,35 +27,323 @@
 Ambient sounds player inspired by Noizio, A Soft Murmur, etc...
 """
 
-import argparse
-from gi.repository import Gtk
+from __future__ import print_function
 
+import sys, argparse, signal, json
 
-from .ui import StatusIcon
-from .sounds import Sound, Preset
+# The modules handling the sounds and the presets (which require PyGObject and mutagen) are only
+# imported by the functions using them, so that the client of the daemon can import the package
+from .playback import ENGINES, MAX_CHANNELS, RATE, CHANNELS, create_engine
+from .constants import PCM_CACHE_DIR, PRESETS_DIR, PRESETS_DB, CONTROL_SOCKET
+from .constants import SETTINGS_FILE
 
-def main():
+def parse_rate(value):
     """
-    Start the interface
+    Parse a sample rate, which is either a number of Hz or "auto"
+    """
+    if value == "auto":
+        return value
+
+    try:
+        rate = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid rate {0}".format(value))
+
+    if rate <= 0:
+        raise argparse.ArgumentTypeError("invalid rate {0}".format(value))
+    return rate
+
+def read_settings(filename):
+    """
+    Read the settings file, a JSON object giving the default values of the command line options
+    (the keys being their names with underscores instead of hyphens, such as "buffer_size")
+    """
+    try:
+        with open(filename, "r") as fileobj:
+            settings = json.load(fileobj)
+    except (IOError, OSError):
+        return {}
+
+    if not isinstance(settings, dict):
+        raise ValueError("the settings should be a JSON object")
+    return settings
+
+def settings_arguments(settings):
+    """
+    Return the command line arguments giving the values of the settings, so that they are checked
+    by the parser like the other arguments (a setting whose value is true is a flag, and the ones
+    whose value is false or null are left to their default values)
+    """
+    arguments = []
+    for name, value in sorted(settings.items()):
+        option = "--" + name.replace("_", "-")
+        if value is True:
+            arguments.append(option)
+        elif value is not None and value is not False:
+            arguments.append(u"{0}={1}".format(option, value))
+    return arguments
+
+def create_parser():
+    """
+    Create the parser of the command line arguments
     """
+    from .sounds import Preset
 
-    # Parse command line arguments
     parser = argparse.ArgumentParser(description='Ambient sound player inspired by Noizio, A ' +
                                                  'Soft Murmur, etc...')
 
     parser.add_argument('--muted', action='store_true', help='start AmbientSounds muted')
     parser.add_argument('--preset', action='store', help='load the preset named PRESET')
+    parser.add_argument('--preset-store', action='store', choices=('json', 'sqlite'),
+                        default='json',
+                        help='store the presets in one JSON file per preset, or in a single ' +
+                             'SQLite database (the JSON presets are imported when it is created)')
+    parser.add_argument('--autosave', action='store', type=float,
+                        default=Preset.autosave_delay, metavar='SECONDS',
+                        help='save the current volumes SECONDS seconds after the last change ' +
+                             '(0 to only save them when quitting, default: %(default)s)')
+    parser.add_argument('--transition', action='store', type=float, default=Preset.transition,
+                        metavar='SECONDS', help='duration of the transition between presets ' +
+                                                '(default: %(default)s)')
+    parser.add_argument('--engine', action='store', choices=ENGINES, default='pygame',
+                        help='playback engine : "pygame" decodes each sound in memory, ' +
+                             '"stream" decodes the sounds by small chunks while playing them, ' +
+                             '"mix" also mixes them in a single stream with numpy')
+    parser.add_argument('--max-channels', action='store', type=int, default=MAX_CHANNELS,
+                        metavar='COUNT', help='maximal number of sounds played at the same ' +
+                                              'time (default: %(default)s)')
+    parser.add_argument('--pcm-cache', action='store', type=int, default=0, metavar='SIZE',
+                        help='cache up to SIZE megabytes of decoded sounds on disk (disabled ' +
+                             'by default), the stream and mix engines memory-map them so that ' +
+                             'they are shared by the processes playing them, the pygame engine ' +
+                             'copies them')
+    parser.add_argument('--pcm-cache-dir', action='store', default=PCM_CACHE_DIR,
+                        metavar='DIR', help='directory of the cache of decoded sounds ' +
+                                            '(default: %(default)s)')
+    parser.add_argument('--loop-cache', action='store', type=int, default=512, metavar='SIZE',
+                        help='cache up to SIZE megabytes of seamless loop buffers on disk ' +
+                             '(default: %(default)s)')
+    parser.add_argument('--memory-budget', action='store', type=int, metavar='SIZE',
+                        help='release the sounds which have been silent for the longest time ' +
+                             'when the loaded sounds use more than SIZE megabytes')
+    parser.add_argument('--no-watch', action='store_true',
+                        help='do not update the sounds when the files of the sound directories ' +
+                             'change')
+    parser.add_argument('--daemon', action='store_true',
+                        help='run without interface, controlled with ambientsounds-ctl')
+    parser.add_argument('--socket', action='store', default=CONTROL_SOCKET, metavar='PATH',
+                        help='socket on which the daemon receives commands (default: ' +
+                             '%(default)s)')
+    parser.add_argument('--render', action='store', metavar='FILE',
+                        help='render the volumes of the preset given with --preset (or the ' +
+                             'current volumes) to FILE instead of playing them')
+    parser.add_argument('--duration', action='store', type=float, default=3600,
+                        metavar='SECONDS', help='duration of the rendered file (default: ' +
+                                                '%(default)s)')
+    parser.add_argument('--render-format', action='store', metavar='FORMAT',
+                        help='format of the rendered file, such as WAV, FLAC or OGG (guessed ' +
+                             'from its extension by default)')
+    parser.add_argument('--jobs', action='store', type=int, metavar='COUNT',
+                        help='number of processes rendering the file (default: one per core)')
+    parser.add_argument('--stats', action='store', metavar='FILE',
+                        help='write statistics about the loading of the sounds, the memory and ' +
+                             'the channels they use and the latency of the interface to FILE')
+    parser.add_argument('--stats-interval', action='store', type=float, default=10,
+                        metavar='SECONDS', help='interval between two writes of the ' +
+                                                'statistics (default: %(default)s)')
+    parser.add_argument('--rate', action='store', type=parse_rate, default=RATE, metavar='HZ',
+                        help='sample rate of the output, or "auto" for the rate of most of the ' +
+                             'sounds, which are then played without resampling (default: ' +
+                             '%(default)s)')
+    parser.add_argument('--channels', action='store', type=int, choices=(1, 2),
+                        default=CHANNELS, help='number of channels of the output (default: ' +
+                                               '%(default)s)')
+    parser.add_argument('--buffer-size', action='store', type=int, metavar='FRAMES',
+                        help='size of the buffer of the mixer, a larger buffer lowers the CPU ' +
+                             'usage and the risk of underruns but increases the latency ' +
+                             '(default: the one of pygame)')
+    parser.add_argument('--show-settings', action='store_true',
+                        help='initialize the mixer, print the audio settings and exit')
+
+    return parser
+
+def parse_arguments():
+    """
+    Parse the command line arguments, whose default values are given by the settings file, and
+    return the parser and the arguments
+    """
+    parser = create_parser()
+
+    # The settings file gives the default values of the options, which are parsed before the
+    # command line arguments so that the latter override them
+    try:
+        settings = read_settings(SETTINGS_FILE)
+    except ValueError as error:
+        parser.error("invalid settings file {0}: {1}".format(SETTINGS_FILE, error))
+
+    defaults = vars(parser.parse_args([]))
+    for name in settings:
+        if name not in defaults:
+            parser.error("unknown setting {0} in {1}".format(name, SETTINGS_FILE))
+
+    args = parser.parse_args(settings_arguments(settings) + sys.argv[1:])
+
+    if args.buffer_size is not None and args.buffer_size <= 0:
+        parser.error("invalid buffer size {0}".format(args.buffer_size))
+
+    return parser, args
+
+def setup(parser, args):
+    """
+    Create the caches and the engine, apply the options of the sounds, the presets and the
+    statistics, and return the engine
+    """
+    from .sounds import Sound, Preset
+    from .cache import PCMCache
+    from .stats import Stats
+
+    try:
+        if args.pcm_cache > 0:
+            pcm_cache = PCMCache(args.pcm_cache_dir, args.pcm_cache*1024*1024)
+        else:
+            pcm_cache = None
+
+        engine = create_engine(args.engine, pcm_cache, max(1, args.max_channels))
+    except ImportError as error:
+        parser.error(str(error))
+
+    Preset.transition = args.transition
+    Preset.autosave_delay = args.autosave if args.autosave > 0 else None
+
+    if args.memory_budget is not None:
+        Sound.memory_budget = args.memory_budget*1024*1024
+    Sound.loop_cache_size = max(1, args.loop_cache)*1024*1024
+
+    if args.stats is not None:
+        Stats.dump_to(args.stats, max(0.1, args.stats_interval))
+
+    return engine
 
-    args = parser.parse_args()
+def show_settings(args, engine):
+    """
+    Initialize the mixer and print the settings it actually uses
+    """
+    engine.init()
+    print("Engine: {0}".format(args.engine))
+    print("Sample rate: {0} Hz{1}".format(
+        engine.rate, " (most common rate of the sounds)" if args.rate == "auto" else ""))
+    print("Channels: {0}".format(engine.channels))
+    if args.buffer_size is None:
+        print("Buffer size: default")
+    else:
+        print("Buffer size: {0} frames ({1:.1f} ms)".format(
+            args.buffer_size, args.buffer_size*1000./engine.rate))
+    print("Maximal number of sounds playing: {0}".format(engine.max_channels))
+
+def run_render(parser, args, engine):
+    """
+    Render the volumes applied by the preset to the file given with --render (the sounds are
+    muted and never played)
+    """
+    from .sounds import Sound, Preset
+
+    try:
+        from .render import render
+    except ImportError:
+        parser.error("rendering requires numpy and soundfile")
+
+    if args.preset is not None and args.preset not in Preset.presets:
+        parser.error("unknown preset {0}".format(args.preset))
+
+    layers = [(sound.filename, sound.seamless, sound.volume/100.)
+              for sound in Sound.sorted() if sound.volume > 0]
+    if not layers:
+        parser.error("no sound is audible in the rendered volumes")
 
-    # Load the sounds and the presets
-    Sound.load(args.muted)
-    Preset.load(args.preset)
+    rate, channels, _ = engine.settings
+    try:
+        render(layers, args.render, args.duration, args.render_format, args.jobs,
+               engine.loop_cache, rate, channels)
+    except ValueError as error:
+        parser.error(str(error))
+
+def run_daemon(server):
+    """
+    Play the sounds without interface until SIGINT or SIGTERM is received
+    """
+    # Only the sounds are loaded, the interface is never imported
+    from gi.repository import GLib
+    from .sounds import Preset
+
+    loop = GLib.MainLoop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signum, loop.quit)
+    loop.run()
+
+    server.close()
+    Preset.quit()
+
+def run_interface():
+    """
+    Display the status icon (the interface is only imported here, so that the other modules can
+    be used without a display)
+    """
+    from gi.repository import Gtk
+    from .ui import StatusIcon
 
-    # Display the status icon
     StatusIcon()
 
     Gtk.main()
 
+def main():
+    """
+    Start the interface
+    """
+    from .sounds import Sound, Preset
+    from .stores import JSONPresetStore, SQLitePresetStore
+
+    parser, args = parse_arguments()
+    engine = setup(parser, args)
+
+    if args.daemon:
+        from .control import ControlServer
+
+        try:
+            server = ControlServer(args.socket)
+        except (IOError, OSError) as error:
+            parser.error(str(error))
+
+    # Load the sounds and the presets (the settings of the mixer are applied once the sounds are
+    # loaded, as the rate may depend on them, but before the presets start playing them)
+    Sound.load(args.muted or args.render is not None or args.show_settings, engine)
+
+    rate = args.rate
+    if rate == "auto":
+        rate = Sound.common_rate() or RATE
+    engine.configure(rate, args.channels, args.buffer_size)
+
+    if args.show_settings:
+        show_settings(args, engine)
+        return
+
+    if args.preset_store == 'sqlite':
+        store = SQLitePresetStore(PRESETS_DB, PRESETS_DIR)
+    else:
+        store = JSONPresetStore(PRESETS_DIR)
+
+    Preset.load(args.preset, store)
+
+    if args.render is not None:
+        run_render(parser, args, engine)
+        return
+
+    if not args.no_watch:
+        Sound.watch()
+
+    if args.daemon:
+        run_daemon(server)
+    else:
+        run_interface()
+
 if __name__ == "__main__":
     main()
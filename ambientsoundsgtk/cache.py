@@ -0,0 +1,259 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module handling the on-disk caches of AmbientSounds
+"""
+
+import os, sys, json, threading, hashlib
+
+from .stores import write_atomic
+
+# Number of frames decoded at once when a sound is added to the PCM cache
+DECODE_FRAMES = 65536
+
+def decode_path(path):
+    """
+    Return a unicode version of a path, such as the keys of the objects read from a JSON file
+    """
+    if isinstance(path, bytes):
+        return path.decode(sys.getfilesystemencoding() or "utf-8", "replace")
+    return path
+
+class MetadataCache(object):
+    """
+    Cache storing the informations about the sounds, keyed by the path of their files, and
+    invalidated when their size or modification time change (it can be used from several threads)
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+        self.modified = False
+        self.lock = threading.Lock()
+
+        # Paths looked up since the cache was read, the other entries are stale
+        self.used = set()
+
+        self.read()
+
+    def read(self):
+        """
+        Read the cache file (a missing or corrupted file gives an empty cache)
+        """
+        try:
+            with open(self.filename, "r") as fileobj:
+                self.entries = json.load(fileobj)
+        except (IOError, OSError, ValueError):
+            self.entries = {}
+
+    def get(self, path, stat):
+        """
+        Return the values stored for the file `path`, or None if they are missing or outdated
+        (`stat` is the result of os.stat on the file)
+        """
+        path = decode_path(path)
+        with self.lock:
+            self.used.add(path)
+            entry = self.entries.get(path)
+
+        if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+            return None
+        return entry["values"]
+
+    def set(self, path, stat, values):
+        """
+        Store the values for the file `path`
+        """
+        path = decode_path(path)
+        with self.lock:
+            self.used.add(path)
+            self.entries[path] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "values": values
+            }
+            self.modified = True
+
+    def save(self):
+        """
+        Evict the stale entries and write the cache file if it changed
+        """
+        with self.lock:
+            for path in set(self.entries) - self.used:
+                del self.entries[path]
+                self.modified = True
+
+            if not self.modified:
+                return
+
+            if not os.path.exists(os.path.dirname(self.filename)):
+                os.makedirs(os.path.dirname(self.filename))
+
+            write_atomic(self.filename, json.dumps(self.entries))
+
+            self.modified = False
+
+class PCMCache(object):
+    """
+    Cache storing the decoded sounds as raw signed 16 bits frames, at the sample rate and with the
+    number of channels of the output. The files are invalidated when the sound files change, and
+    the least recently used ones are evicted when the cache exceeds its maximal size.
+    """
+
+    description = "PCM cache"
+
+    def __init__(self, directory, max_size=None):
+        """
+        Create the cache in `directory`, its size being limited to `max_size` bytes (None for no
+        limit)
+        """
+        try:
+            from .decoder import Decoder
+        except ImportError:
+            raise ImportError("the {0} requires numpy and soundfile".format(self.description))
+
+        self.decoder_class = Decoder
+        self.directory = directory
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+    def path(self, filename, rate, channels):
+        """
+        Return the path of the decoded version of the sound file `filename`
+        """
+        stat = os.stat(filename)
+
+        # The representation of the tuple escapes the non-ASCII characters of byte string paths
+        key = repr((os.path.abspath(filename), stat.st_size, stat.st_mtime, rate, channels))
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".pcm")
+
+    def get(self, filename, rate, channels):
+        """
+        Return the path of the decoded version of the sound file `filename`, decoding it first if
+        it is not in the cache
+        """
+        path = self.path(filename, rate, channels)
+
+        try:
+            # Mark the file as recently used
+            os.utime(path, None)
+            return path
+        except OSError:
+            pass
+
+        if not os.path.exists(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # Created concurrently
+                pass
+
+        # Write the frames to a temporary file first, so that other threads or processes never
+        # read an incomplete file
+        tmp_path = "{0}.{1}.{2}.tmp".format(path, os.getpid(), threading.current_thread().ident)
+        try:
+            with open(tmp_path, "wb") as fileobj:
+                for frames in self.generate(filename, rate, channels):
+                    frames = frames.clip(-1, 1)*32767
+                    frames.astype("int16").tofile(fileobj)
+            os.rename(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.evict(path)
+        return path
+
+    def generate(self, filename, rate, channels):
+        """
+        Decode the sound file, yielding arrays of float frames
+        """
+        decoder = self.decoder_class(filename, rate, channels)
+        try:
+            while True:
+                frames = decoder.read(DECODE_FRAMES)
+                if len(frames) == 0:
+                    break
+                yield frames
+        finally:
+            decoder.close()
+
+    def evict(self, keep):
+        """
+        Remove the least recently used files until the size of the cache is below its limit
+        (except the file `keep`)
+        """
+        if self.max_size is None:
+            return
+
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if os.path.splitext(name)[1] != ".pcm":
+                    continue
+
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            size = sum(entry[1] for entry in entries)
+            for _, file_size, path in sorted(entries):
+                if size <= self.max_size:
+                    break
+                if path == keep:
+                    continue
+
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Evicted concurrently
+                    pass
+                size -= file_size
+
+class LoopCache(PCMCache):
+    """
+    Cache storing seamless loop buffers of the sounds, in which the end of the sound is crossfaded
+    with its beginning at the loop point which matches it best
+    """
+
+    description = "seamless loops cache"
+
+    def __init__(self, directory, max_size=None):
+        PCMCache.__init__(self, directory, max_size)
+
+        from .loops import make_loop
+        self.make_loop = make_loop
+
+    def generate(self, filename, rate, channels):
+        """
+        Decode the whole sound file and yield its loop buffer
+        """
+        chunks = list(PCMCache.generate(self, filename, rate, channels))
+        if chunks:
+            yield self.make_loop(chunks, rate)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Client sending commands to an AmbientSounds daemon through its control socket (see the control
+module), which only depends on the standard library
+"""
+
+from __future__ import print_function
+
+import sys, socket, argparse
+
+try:
+    from shlex import quote
+except ImportError:
+    from pipes import quote
+
+from .constants import CONTROL_SOCKET
+
+# Maximal size of a command line
+MAX_LINE = 4096
+
+# Time after which the client stops waiting for the daemon, in seconds
+TIMEOUT = 10.0
+
+# Usage of each command
+USAGES = {
+    "set-volume": "set-volume SOUND VOLUME",
+    "set-master": "set-master VOLUME",
+    "mute": "mute [on|off|toggle]",
+    "apply-preset": "apply-preset PRESET",
+    "save-preset": "save-preset PRESET",
+}
+
+def send(words, path=CONTROL_SOCKET):
+    """
+    Send a command to the daemon and return its answer
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(TIMEOUT)
+    try:
+        connection.connect(path)
+        connection.sendall((u" ".join([quote(word) for word in words]) + u"\n").encode("utf-8"))
+        connection.shutdown(socket.SHUT_WR)
+
+        answer = b""
+        while not answer.endswith(b"\n"):
+            data = connection.recv(MAX_LINE)
+            if not data:
+                break
+            answer += data
+    finally:
+        connection.close()
+
+    return answer.decode("utf-8").strip()
+
+def client_main():
+    """
+    Send the command given on the command line to the daemon
+    """
+    usages = sorted(USAGES.values())
+    parser = argparse.ArgumentParser(description='Control an AmbientSounds daemon.',
+                                     epilog='commands: ' + ', '.join(usages))
+    parser.add_argument('--socket', action='store', default=CONTROL_SOCKET, metavar='PATH',
+                        help='socket of the daemon (default: %(default)s)')
+    parser.add_argument('command', choices=sorted(USAGES), help='command to send')
+    parser.add_argument('arguments', nargs='*', help='arguments of the command')
+
+    args = parser.parse_args()
+
+    words = [args.command] + args.arguments
+    if sys.version_info[0] < 3:
+        words = [word.decode("utf-8") for word in words]
+
+    try:
+        answer = send(words, args.socket)
+    except socket.error as error:
+        print("could not communicate with the daemon: {0}".format(error), file=sys.stderr)
+        sys.exit(1)
+
+    if answer != "ok":
+        print(answer, file=sys.stderr)
+        sys.exit(1)
@@ -43,8 +43,29 @@ SOUNDS_DIRS = [os.path.expanduser("~/.config/ambientsounds/sounds"),
                "/usr/share/ambientsounds/sounds",
                os.path.join(APP_DIR, "sounds")]
 
+# Name of the file enabling the seamless loops for the sounds of a directory
+SEAMLESS_LOOPS_FILE = ".seamless-loops"
+
+# File giving the default values of the command line options
+SETTINGS_FILE = os.path.expanduser("~/.config/ambientsounds/settings.json")
+
 # Directory containing the presets
 PRESETS_DIR = os.path.expanduser("~/.config/ambientsounds/presets")
 
+# Database containing the presets when they are stored with SQLite
+PRESETS_DB = os.path.expanduser("~/.config/ambientsounds/presets.sqlite")
+
+# Directory containing the caches
+CACHE_DIR = os.path.expanduser("~/.cache/ambientsounds")
+
+# Default directory of the cache of decoded sounds
+PCM_CACHE_DIR = os.path.join(CACHE_DIR, "pcm")
+
+# Directory of the cache of seamless loop buffers
+LOOP_CACHE_DIR = os.path.join(CACHE_DIR, "loops")
+
+# Unix socket on which the daemon receives commands
+CONTROL_SOCKET = os.path.join(os.environ.get("XDG_RUNTIME_DIR", CACHE_DIR), "ambientsounds.sock")
+
 # Directory containing the icons
 ICON_PATH = os.path.join(APP_DIR, "icons")
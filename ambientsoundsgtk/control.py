@@ -0,0 +1,238 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module allowing AmbientSounds to be controlled through a Unix socket, with a line based protocol :
+each line contains a command and its arguments (quoted as in a shell), and the daemon answers with
+a line starting with "ok" or "error:"
+"""
+
+import os, sys, socket, shlex
+
+from gi.repository import GLib
+
+from .sounds import Sound, Preset
+from .client import MAX_LINE, USAGES
+from .constants import CONTROL_SOCKET
+
+def parse_volume(value):
+    """
+    Parse a volume between 0 and 100
+    """
+    try:
+        volume = int(value)
+    except ValueError:
+        raise ValueError(u"invalid volume {0}".format(value))
+
+    if not 0 <= volume <= 100:
+        raise ValueError("the volume should be between 0 and 100")
+    return volume
+
+def find(items, name):
+    """
+    Return the item named `name` (a unicode string) in the dictionary `items`, whose keys may also
+    be UTF-8 byte strings, such as the names read from the filenames under Python 2
+    """
+    if name not in items:
+        name = name.encode("utf-8")
+    return items[name]
+
+def split(line):
+    """
+    Split a command line received as UTF-8 bytes into unicode words (the shlex module of Python 2
+    only handles byte strings)
+    """
+    if sys.version_info[0] < 3:
+        return [word.decode("utf-8", "replace") for word in shlex.split(line)]
+    return shlex.split(line.decode("utf-8", "replace"))
+
+def set_volume(name, volume):
+    """
+    Set the volume of the sound named `name`
+    """
+    try:
+        sound = find(Sound.sounds, name)
+    except KeyError:
+        raise ValueError(u"unknown sound {0}".format(name))
+    sound.set_volume(parse_volume(volume))
+
+def set_master(volume):
+    """
+    Set the master volume
+    """
+    Sound.set_master_volume(parse_volume(volume))
+
+def mute(state="toggle"):
+    """
+    Mute ("on"), unmute ("off") or toggle ("toggle") the sounds
+    """
+    if state == "on":
+        Sound.set_muted(True)
+    elif state == "off":
+        Sound.set_muted(False)
+    elif state == "toggle":
+        Sound.toggle_muted()
+    else:
+        raise ValueError("expected on, off or toggle")
+
+def apply_preset(name):
+    """
+    Apply the preset named `name`
+    """
+    try:
+        preset = find(Preset.presets, name)
+    except KeyError:
+        raise ValueError(u"unknown preset {0}".format(name))
+    if not preset.apply():
+        raise ValueError(u"unknown preset {0}".format(name))
+
+def save_preset(name):
+    """
+    Save the current volumes in the preset named `name`
+    """
+    if not name or name.startswith(".") or "/" in name or os.sep in name:
+        raise ValueError(u"invalid preset name {0}".format(name))
+    Preset.save_as(name)
+
+# Function handling each command, and minimal and maximal numbers of arguments
+COMMANDS = {
+    "set-volume": (set_volume, 2, 2),
+    "set-master": (set_master, 1, 1),
+    "mute": (mute, 0, 1),
+    "apply-preset": (apply_preset, 1, 1),
+    "save-preset": (save_preset, 1, 1),
+}
+
+def execute(line):
+    """
+    Execute a command line (UTF-8 bytes) and return the answer
+    """
+    try:
+        words = split(line)
+    except ValueError as error:
+        return u"error: {0}".format(error)
+
+    if not words:
+        return "error: empty command"
+
+    try:
+        function, min_args, max_args = COMMANDS[words[0]]
+    except KeyError:
+        return u"error: unknown command {0}".format(words[0])
+
+    if not min_args <= len(words) - 1 <= max_args:
+        return "error: usage: {0}".format(USAGES[words[0]])
+
+    try:
+        function(*words[1:])
+    except (ValueError, IOError, OSError, KeyError) as error:
+        return u"error: {0}".format(error)
+
+    return "ok"
+
+class ControlServer(object):
+    """
+    Server accepting the connections on the control socket from the main loop
+    """
+    def __init__(self, path=CONTROL_SOCKET):
+        self.path = path
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except socket.error:
+                # The socket was left by a daemon which did not exit properly
+                os.remove(path)
+            else:
+                raise IOError("another daemon is listening on {0}".format(path))
+            finally:
+                probe.close()
+
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.bind(path)
+        os.chmod(path, 0o600)
+        self.socket.listen(5)
+
+        self.source = GLib.io_add_watch(self.socket.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN,
+                                        self.on_connection)
+
+    def on_connection(self, source, condition):
+        """
+        Accept a connection
+        """
+        connection, _ = self.socket.accept()
+        ControlConnection(connection)
+        return True
+
+    def close(self):
+        """
+        Stop listening and remove the socket
+        """
+        GLib.source_remove(self.source)
+        self.socket.close()
+        os.remove(self.path)
+
+class ControlConnection(object):
+    """
+    Connection on which commands are received, read from the main loop
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.connection.settimeout(1.0)
+        self.data = b""
+        GLib.io_add_watch(connection.fileno(), GLib.PRIORITY_DEFAULT,
+                          GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR, self.on_data)
+
+    def on_data(self, source, condition):
+        """
+        Execute the commands received, return False once the connection is closed
+        """
+        try:
+            data = self.connection.recv(MAX_LINE)
+        except socket.error:
+            data = b""
+
+        if not data:
+            self.connection.close()
+            return False
+
+        self.data += data
+        while b"\n" in self.data:
+            line, self.data = self.data.split(b"\n", 1)
+            answer = execute(line)
+            try:
+                self.connection.sendall((answer + u"\n").encode("utf-8"))
+            except socket.error:
+                self.connection.close()
+                return False
+
+        if len(self.data) > MAX_LINE:
+            self.connection.close()
+            return False
+
+        return True
@@ -0,0 +1,223 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module decoding the sound files by small chunks, using soundfile and numpy
+"""
+
+import os, math
+import numpy
+import soundfile
+
+def convert_channels(data, channels):
+    """
+    Convert an array of frames to the given number of channels
+    """
+    if data.shape[1] == channels:
+        return data
+
+    if data.shape[1] == 1 or channels == 1:
+        return numpy.repeat(data.mean(axis=1, keepdims=True), channels, axis=1)
+
+    if data.shape[1] > channels:
+        return data[:, :channels]
+
+    missing = numpy.repeat(data.mean(axis=1, keepdims=True), channels - data.shape[1], axis=1)
+    return numpy.concatenate((data, missing), axis=1)
+
+class Decoder(object):
+    """
+    Object decoding an audio file by small chunks, converting it to the sample rate and to the
+    number of channels of the output, and optionally looping it
+    """
+    def __init__(self, filename, rate, channels, loop=False):
+        self.file = soundfile.SoundFile(filename)
+        self.channels = channels
+        self.loop = loop
+
+        # Number of input frames per output frame
+        self.step = self.file.samplerate / float(rate)
+
+        # Input frames which have not been entirely consumed by the resampling, and position of
+        # the next output frame relative to the first of them
+        self.pending = numpy.zeros((0, channels), numpy.float32)
+        self.position = 0.0
+
+    def read_input(self, frames):
+        """
+        Read up to `frames` frames from the file, without resampling them
+        """
+        chunks = []
+        while frames > 0:
+            data = self.file.read(frames, dtype="float32", always_2d=True)
+            if len(data) == 0:
+                if not self.loop or self.file.frames == 0:
+                    break
+                self.file.seek(0)
+                continue
+
+            chunks.append(convert_channels(data, self.channels))
+            frames -= len(data)
+
+        if not chunks:
+            return numpy.zeros((0, self.channels), numpy.float32)
+        elif len(chunks) == 1:
+            return chunks[0]
+        return numpy.concatenate(chunks)
+
+    def read(self, frames):
+        """
+        Return up to `frames` frames at the output sample rate (less only at the end of the file
+        if it is not looped)
+        """
+        if self.step == 1.0:
+            return self.read_input(frames)
+
+        # Resample by linear interpolation
+        needed = int(self.position + (frames - 1) * self.step) + 2
+        if len(self.pending) < needed:
+            data = self.read_input(needed - len(self.pending))
+            self.pending = numpy.concatenate((self.pending, data))
+
+        if len(self.pending) < needed:
+            # End of the file
+            frames = int(math.ceil((len(self.pending) - 1 - self.position) / self.step))
+            if frames <= 0:
+                return numpy.zeros((0, self.channels), numpy.float32)
+
+        positions = self.position + numpy.arange(frames) * self.step
+        indexes = positions.astype(numpy.int64)
+        fractions = (positions - indexes).astype(numpy.float32)[:, numpy.newaxis]
+        output = (self.pending[indexes] * (1 - fractions) +
+                  self.pending[indexes + 1] * fractions)
+
+        self.position += frames * self.step
+        consumed = int(self.position)
+        self.pending = self.pending[consumed:]
+        self.position -= consumed
+
+        return output
+
+    def close(self):
+        """
+        Close the file
+        """
+        self.file.close()
+
+class CachedDecoder(object):
+    """
+    Object reading the frames of a sound from its decoded version in the PCM cache. The file is
+    memory-mapped, so that its pages are shared by all the processes playing it.
+    """
+    def __init__(self, filename, channels, loop=False):
+        self.channels = channels
+        self.loop = loop
+        self.position = 0
+
+        if os.path.getsize(filename) == 0:
+            self.data = numpy.zeros((0, channels), numpy.int16)
+        else:
+            self.data = numpy.memmap(filename, dtype=numpy.int16, mode="r").reshape(-1, channels)
+
+    def read(self, frames):
+        """
+        Return up to `frames` frames (less only at the end of the file if it is not looped)
+        """
+        chunks = []
+        while frames > 0:
+            if self.position >= len(self.data):
+                if not self.loop or len(self.data) == 0:
+                    break
+                self.position = 0
+
+            chunk = self.data[self.position:self.position+frames]
+            chunks.append(chunk.astype(numpy.float32)/32768)
+            self.position += len(chunk)
+            frames -= len(chunk)
+
+        if not chunks:
+            return numpy.zeros((0, self.channels), numpy.float32)
+        elif len(chunks) == 1:
+            return chunks[0]
+        return numpy.concatenate(chunks)
+
+    def seek(self, frame):
+        """
+        Move to the frame `frame` (counted from the beginning of the file, which is looped if the
+        decoder loops)
+        """
+        if self.loop and len(self.data) > 0:
+            self.position = frame % len(self.data)
+        else:
+            self.position = min(frame, len(self.data))
+
+    def close(self):
+        """
+        Unmap the file
+        """
+        self.data = None
+
+class RingBuffer(object):
+    """
+    Fixed-size FIFO buffer of audio frames
+    """
+    def __init__(self, frames, channels):
+        self.data = numpy.zeros((frames, channels), numpy.float32)
+        self.start = 0
+        self.length = 0
+
+    def space(self):
+        """
+        Return the number of frames that can be written to the buffer
+        """
+        return len(self.data) - self.length
+
+    def write(self, frames):
+        """
+        Append frames to the buffer (there should be enough space for them)
+        """
+        capacity = len(self.data)
+        end = (self.start + self.length) % capacity
+        count = len(frames)
+        first = min(count, capacity - end)
+
+        self.data[end:end+first] = frames[:first]
+        self.data[:count-first] = frames[first:]
+        self.length += count
+
+    def read(self, count):
+        """
+        Remove and return up to `count` frames from the buffer
+        """
+        capacity = len(self.data)
+        count = min(count, self.length)
+        first = min(count, capacity - self.start)
+
+        output = numpy.concatenate((self.data[self.start:self.start+first],
+                                    self.data[:count-first]))
+        self.start = (self.start + count) % capacity
+        self.length -= count
+
+        return output
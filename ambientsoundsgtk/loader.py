@@ -0,0 +1,71 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module running the slow jobs (such as the loading of the sounds) in a pool of worker threads,
+without blocking the main loop
+"""
+
+import sys
+from multiprocessing.pool import ThreadPool
+from gi.repository import GLib
+
+# Number of worker threads
+WORKERS = 2
+
+def run(function, args):
+    """
+    Run a job in a worker thread, and return its result and the exception info (if it failed)
+    """
+    try:
+        return function(*args), None
+    except Exception: # pylint: disable=broad-except
+        return None, sys.exc_info()
+
+def dispatch(callback, outcome):
+    """
+    Call the completion callback of a job from the main loop
+    """
+    callback(*outcome)
+    return False
+
+class Loader(object):
+    """
+    Pool of worker threads reporting the results of the jobs to the main loop
+    """
+
+    pool = None
+
+    @staticmethod
+    def submit(function, args, callback):
+        """
+        Call function(*args) in a worker thread, then call callback(result, exc_info) from the main
+        loop once it has returned (exc_info is None if the function did not raise an exception)
+        """
+        if Loader.pool is None:
+            Loader.pool = ThreadPool(WORKERS)
+
+        Loader.pool.apply_async(run, (function, args),
+                                callback=lambda outcome: GLib.idle_add(dispatch, callback, outcome))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module building seamless loop buffers, in which the end of a sound is crossfaded with its
+beginning, so that it can be looped without clicks and without any processing at playback time
+"""
+
+import numpy
+
+# Duration of the crossfade in seconds (at most a quarter of the sound)
+CROSSFADE = 1.0
+
+# Duration of the end of the sound in which the loop point is searched, in seconds (at most a
+# quarter of the sound)
+SEARCH = 2.0
+
+def find_loop(mono, crossfade, search):
+    """
+    Return the end of the loop, chosen among the last `search` frames of the sound so that the
+    `crossfade` frames preceding it are the most correlated with the beginning of the sound
+    """
+    start = len(mono) - search - crossfade
+    region = mono[start:]
+    head = mono[:crossfade]
+
+    # Cross-correlation of the beginning of the sound with each window of the region, computed
+    # with FFTs
+    size = 1
+    while size < len(region) + crossfade:
+        size *= 2
+    correlation = numpy.fft.irfft(numpy.fft.rfft(region, size) *
+                                  numpy.conj(numpy.fft.rfft(head, size)), size)[:search + 1]
+
+    # Normalize it by the energy of the windows
+    energy = numpy.concatenate(([0], numpy.cumsum(region.astype(numpy.float64)**2)))
+    window_energy = energy[crossfade:crossfade + search + 1] - energy[:search + 1]
+    score = correlation/numpy.sqrt(window_energy*numpy.sum(head**2) + 1e-9)
+
+    return start + int(numpy.argmax(score)) + crossfade
+
+def make_loop(chunks, rate):
+    """
+    Return the loop buffer of a sound, given the chunks of its decoded frames
+    """
+    data = numpy.concatenate(chunks)
+
+    crossfade = min(int(rate*CROSSFADE), len(data)//4)
+    search = min(int(rate*SEARCH), len(data)//4)
+    if crossfade < 2:
+        return data
+
+    end = find_loop(data.mean(axis=1), crossfade, search)
+
+    # The loop starts after the beginning of the sound, which is mixed in the crossfade at its end
+    fade = numpy.linspace(0, 1, crossfade, dtype=numpy.float32)[:, numpy.newaxis]
+    tail = data[end-crossfade:end]*(1 - fade) + data[:crossfade]*fade
+
+    return numpy.concatenate((data[crossfade:end-crossfade], tail))
@@ -0,0 +1,276 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module defining the engines used to play the sounds with pygame, which is only imported once a
+sound becomes audible
+"""
+
+import threading
+
+# Names of the available engines
+ENGINES = ("pygame", "stream", "mix")
+
+# Default maximal number of mixer channels
+MAX_CHANNELS = 32
+
+# Default sample rate and number of channels of the output
+RATE = 48000
+CHANNELS = 2
+
+# Lock preventing the mixer from being initialized twice
+INIT_LOCK = threading.Lock()
+
+def init_mixer(rate=RATE, channels=CHANNELS, buffer_size=None):
+    """
+    Import pygame and initialize its mixer if necessary (with a buffer of `buffer_size` frames, or
+    the default one of pygame if it is None), and return the pygame.mixer module
+    """
+    with INIT_LOCK:
+        import pygame
+        if not pygame.mixer.get_init():
+            if buffer_size is None:
+                pygame.mixer.init(frequency=rate, channels=channels)
+            else:
+                pygame.mixer.init(frequency=rate, channels=channels, buffer=buffer_size)
+        return pygame.mixer
+
+def create_engine(name, pcm_cache=None, max_channels=MAX_CHANNELS, loop_cache=None):
+    """
+    Create the engine named `name`
+    """
+    if name == "pygame":
+        return PygameEngine(pcm_cache, max_channels, loop_cache)
+
+    try:
+        from .streaming import StreamEngine, MixEngine
+    except ImportError:
+        raise ImportError("the {0} engine requires numpy and soundfile".format(name))
+
+    if name == "stream":
+        return StreamEngine(pcm_cache, max_channels, loop_cache)
+    elif name == "mix":
+        return MixEngine(pcm_cache, max_channels, loop_cache)
+    raise ValueError("unknown engine {0}".format(name))
+
+class ChannelPool(object):
+    """
+    Pool of mixer channels, grown when a sound starts playing and shrunk once the channels at its
+    end are free, up to a maximal number of channels
+    """
+    def __init__(self, mixer, max_channels):
+        self.mixer = mixer
+        self.max_channels = max_channels
+        self.lock = threading.Lock()
+
+        # Channels used by a player (a released channel may still be fading out)
+        self.reserved = set()
+
+        mixer.set_num_channels(0)
+
+    def acquire(self):
+        """
+        Reserve a free channel (growing the pool if necessary) and return its id. If the maximal
+        number of channels is reached, a channel which is fading out is stopped and reused, and
+        None is returned if there are none.
+        """
+        with self.lock:
+            self.shrink()
+            count = self.mixer.get_num_channels()
+
+            free = [channel_id for channel_id in range(count) if channel_id not in self.reserved]
+            for channel_id in free:
+                if not self.mixer.Channel(channel_id).get_busy():
+                    break
+            else:
+                if count < self.max_channels:
+                    channel_id = count
+                    self.mixer.set_num_channels(count + 1)
+                elif free:
+                    channel_id = free[0]
+                    self.mixer.Channel(channel_id).stop()
+                else:
+                    return None
+
+            self.reserved.add(channel_id)
+            return channel_id
+
+    def release(self, channel_id):
+        """
+        Release a channel (it is left playing until the end of its sound or of its fade out)
+        """
+        with self.lock:
+            self.reserved.discard(channel_id)
+            self.shrink()
+
+    def shrink(self):
+        """
+        Remove the free channels at the end of the pool (the lock should be held)
+        """
+        count = self.mixer.get_num_channels()
+        new_count = count
+        while (new_count > 0 and new_count - 1 not in self.reserved and
+               not self.mixer.Channel(new_count - 1).get_busy()):
+            new_count -= 1
+
+        if new_count != count:
+            self.mixer.set_num_channels(new_count)
+
+    def size(self):
+        """
+        Return the number of channels in the pool
+        """
+        return self.mixer.get_num_channels()
+
+class Engine(object):
+    """
+    Base class of the engines, the mixer is initialized when the first sound is loaded
+    """
+    def __init__(self, pcm_cache=None, max_channels=MAX_CHANNELS, loop_cache=None):
+        self.pcm_cache = pcm_cache
+        self.loop_cache = loop_cache
+        self.max_channels = max_channels
+        self.lock = threading.RLock()
+
+        # Settings of the mixer, applied when it is initialized
+        self.settings = (RATE, CHANNELS, None)
+
+        # Set once the mixer is initialized (the rate and number of channels are the ones of the
+        # mixer, which may differ from the requested ones)
+        self.initialized = False
+        self.mixer = None
+        self.pool = None
+        self.rate = None
+        self.channels = None
+
+    def init(self):
+        """
+        Initialize the mixer if necessary
+        """
+        with self.lock:
+            if not self.initialized:
+                self.mixer = init_mixer(*self.settings)
+                self.rate, _, self.channels = self.mixer.get_init()
+                self.pool = ChannelPool(self.mixer, self.max_channels)
+                self.initialized = True
+
+    def configure(self, rate=RATE, channels=CHANNELS, buffer_size=None):
+        """
+        Set the sample rate and the number of channels of the output, and the size of the buffer
+        of the mixer in frames (None for the default of pygame), before the mixer is initialized
+        """
+        self.settings = (rate, channels, buffer_size)
+
+    def shrink(self):
+        """
+        Remove the channels which are no longer used from the pool
+        """
+        if self.initialized:
+            with self.pool.lock:
+                self.pool.shrink()
+
+    def cached(self, filename, seamless=False):
+        """
+        Return the path of the decoded version of the sound file in the PCM cache (decoding it if
+        necessary), or None if the cache is disabled. If `seamless` is True, the path of its
+        seamless loop buffer is returned instead (if the loop cache is available).
+        """
+        if seamless and self.loop_cache is not None:
+            return self.loop_cache.get(filename, self.rate, self.channels)
+
+        if self.pcm_cache is None:
+            return None
+        return self.pcm_cache.get(filename, self.rate, self.channels)
+
+class BufferedPlayer(object):
+    """
+    Player decoding the whole sound file in memory, and letting SDL_mixer loop it
+    """
+    def __init__(self, engine, filename, pcm_filename=None):
+        """
+        Load the sound file `filename`, or its decoded version `pcm_filename` from the PCM cache
+        """
+        self.engine = engine
+        mixer = engine.mixer
+
+        # Id of the channel on which the sound is playing
+        self.channel_id = None
+
+        if pcm_filename is None:
+            self.sound = mixer.Sound(filename)
+        else:
+            # The frames are copied by pygame, so the cache only saves the decoding (the file is
+            # not shared with the other processes as with the stream and mix engines)
+            with open(pcm_filename, "rb") as fileobj:
+                self.sound = mixer.Sound(buffer=fileobj.read())
+
+        # Memory used by the decoded sound (the mixer uses 16 bits samples)
+        rate, _, channels = mixer.get_init()
+        self.nbytes = int(self.sound.get_length()*rate)*channels*2
+
+    def get_busy(self):
+        """
+        Return True if the sound is playing (or fading out)
+        """
+        return self.sound.get_num_channels() > 0
+
+    def set_volume(self, volume):
+        """
+        Set the volume (between 0 and 1)
+        """
+        self.sound.set_volume(volume)
+
+    def play(self, fade_ms):
+        """
+        Play the sound in a loop, fading it in. Return False if it cannot be played because all
+        the channels are used.
+        """
+        if self.channel_id is None:
+            self.channel_id = self.engine.pool.acquire()
+            if self.channel_id is None:
+                return False
+            self.engine.mixer.Channel(self.channel_id).play(self.sound, -1, 0, fade_ms)
+        return True
+
+    def fadeout(self, fade_ms):
+        """
+        Fade out and stop the sound
+        """
+        if self.channel_id is not None:
+            self.engine.mixer.Channel(self.channel_id).fadeout(fade_ms)
+            self.engine.pool.release(self.channel_id)
+            self.channel_id = None
+
+class PygameEngine(Engine):
+    """
+    Engine loading each sound in a pygame.mixer.Sound object
+    """
+    def load(self, filename, seamless=False):
+        """
+        Return a player for the sound file `filename` (using its seamless loop buffer if
+        `seamless` is True)
+        """
+        self.init()
+        return BufferedPlayer(self, filename, self.cached(filename, seamless))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module rendering a mix of sounds to an audio file faster than realtime, using numpy and soundfile
+"""
+
+import tempfile, shutil
+from collections import deque
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
+import numpy
+import soundfile
+
+from .decoder import CachedDecoder
+from .cache import PCMCache
+
+# Sample rate and number of channels of the rendered files
+RATE = 48000
+CHANNELS = 2
+
+# Duration of the segments rendered in parallel, in seconds (the memory used by the rendering is
+# proportional to it)
+SEGMENT_SECONDS = 30
+
+# Number of frames mixed at once
+BLOCK_FRAMES = 65536
+
+# Duration of the fade in at the beginning of the file and of the fade out at its end, in seconds
+FADE_SECONDS = 1.0
+
+def fade(output, start, total, rate):
+    """
+    Apply the fade in and the fade out to the segment `output`, starting at the frame `start` of a
+    file of `total` frames
+    """
+    fade_frames = min(int(FADE_SECONDS*rate), total//2)
+    if fade_frames == 0:
+        return
+
+    if start < fade_frames:
+        count = min(fade_frames - start, len(output))
+        gains = numpy.arange(start, start + count, dtype=numpy.float32)/fade_frames
+        output[:count] *= gains[:, numpy.newaxis]
+
+    end = start + len(output)
+    if end > total - fade_frames:
+        first = max(start, total - fade_frames)
+        gains = numpy.arange(total - first, total - end, -1, dtype=numpy.float32)/fade_frames
+        output[first - start:] *= gains[:, numpy.newaxis]
+
+def render_segment(layers, rate, channels, start, frames, total):
+    """
+    Mix `frames` frames of the layers, starting at the frame `start` of a file of `total` frames
+    (each layer is a (pcm_filename, gain) tuple, the decoded sound being looped)
+    """
+    output = numpy.zeros((frames, channels), numpy.float32)
+
+    for pcm_filename, gain in layers:
+        gain = numpy.float32(gain)
+        decoder = CachedDecoder(pcm_filename, channels, loop=True)
+        try:
+            decoder.seek(start)
+
+            position = 0
+            while position < frames:
+                data = decoder.read(min(BLOCK_FRAMES, frames - position))
+                if len(data) == 0:
+                    break
+
+                data *= gain
+                output[position:position+len(data)] += data
+                position += len(data)
+        finally:
+            decoder.close()
+
+    fade(output, start, total, rate)
+    numpy.clip(output, -1, 1, out=output)
+    return output
+
+def render(layers, filename, duration, file_format=None, processes=None, loop_cache=None,
+           rate=RATE, channels=CHANNELS):
+    """
+    Render `duration` seconds of the layers (each one being a (filename, seamless, gain) tuple)
+    to the file `filename`, in the format `file_format` (guessed from its extension by default).
+
+    The sounds are decoded once to temporary files (or read from the seamless loops cache), which
+    are memory-mapped by `processes` processes (by default, one per core) rendering the segments of
+    the file, while the segments are written in order.
+    """
+    if processes is None:
+        processes = cpu_count()
+    processes = max(1, processes)
+
+    total = int(duration*rate)
+    segment_frames = SEGMENT_SECONDS*rate
+
+    try:
+        output = soundfile.SoundFile(filename, "w", rate, channels, format=file_format)
+    except (TypeError, ValueError, RuntimeError) as error:
+        raise ValueError("cannot write {0}: {1}".format(filename, error))
+
+    tmp_dir = tempfile.mkdtemp(prefix="ambientsounds-")
+    try:
+        pcm_cache = PCMCache(tmp_dir)
+
+        def decode(layer):
+            """
+            Return the path of the decoded version of a layer and its gain
+            """
+            sound_filename, seamless, gain = layer
+            if seamless and loop_cache is not None:
+                return loop_cache.get(sound_filename, rate, channels), gain
+            return pcm_cache.get(sound_filename, rate, channels), gain
+
+        pool = ThreadPool(processes)
+        try:
+            pcm_layers = pool.map(decode, layers)
+        finally:
+            pool.close()
+            pool.join()
+
+        pool = Pool(processes)
+        try:
+            # Only a few segments are rendered ahead, so that the memory usage does not depend on
+            # the duration
+            pending = deque()
+            start = 0
+            while start < total or pending:
+                while start < total and len(pending) < 2*processes:
+                    frames = min(segment_frames, total - start)
+                    pending.append(pool.apply_async(render_segment, (pcm_layers, rate, channels,
+                                                                     start, frames, total)))
+                    start += frames
+
+                output.write(pending.popleft().get())
+        finally:
+            pool.terminate()
+            pool.join()
+    finally:
+        output.close()
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module defining an in-memory index used to search the sounds by their informations
+"""
+
+import re
+
+# Words shorter than this only match the beginning of the words of the indexed fields, instead of
+# any part of them (which is found by looking up their substrings of this length)
+SUBSTRING_MIN = 3
+
+# Regular expression matching the words of a text
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def normalize(text):
+    """
+    Return a lower case unicode version of a text (or an empty string if it is None)
+    """
+    if text is None:
+        return u""
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    return text.lower()
+
+def prefixes(words):
+    """
+    Return the set of the prefixes of some words which are shorter than SUBSTRING_MIN
+    """
+    return set([word[:length] for word in words for length in range(1, SUBSTRING_MIN)])
+
+def substrings(word):
+    """
+    Return the set of the substrings of a word whose length is SUBSTRING_MIN
+    """
+    return set([word[i:i + SUBSTRING_MIN] for i in range(len(word) - SUBSTRING_MIN + 1)])
+
+class SearchIndex(object):
+    """
+    Index of the fields of a set of items (identified by a key), finding the ones containing each
+    word of a query. Short words are looked up in the sets of the items having a word starting
+    with each short prefix. Longer words are looked up in the sets of the items having each word
+    of the fields, the words containing them being found through the sets of the words containing
+    each of their substrings of length SUBSTRING_MIN.
+    """
+    def __init__(self):
+        # Words of each item
+        self.words = {}
+
+        # Sets of the keys of the items having a word starting with each short prefix, and having
+        # each word
+        self.prefixes = {}
+        self.items = {}
+
+        # Sets of the words (of all the items) containing each substring of length SUBSTRING_MIN
+        self.substrings = {}
+
+        # Results of the lookups of the words of the last queries
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, key, fields):
+        """
+        Add an item (replacing the one with the same key)
+        """
+        self.remove(key)
+
+        words = set()
+        for field in fields:
+            words.update(WORD_RE.findall(normalize(field)))
+        self.words[key] = words
+
+        for prefix in prefixes(words):
+            self.prefixes.setdefault(prefix, set()).add(key)
+
+        for word in words:
+            if word not in self.items:
+                self.items[word] = set()
+                for substring in substrings(word):
+                    self.substrings.setdefault(substring, set()).add(word)
+            self.items[word].add(key)
+
+        self.cache.clear()
+
+    def remove(self, key):
+        """
+        Remove an item if it is in the index
+        """
+        if key not in self.words:
+            return
+
+        words = self.words.pop(key)
+        for prefix in prefixes(words):
+            discard(self.prefixes, prefix, key)
+
+        for word in words:
+            if discard(self.items, word, key):
+                for substring in substrings(word):
+                    discard(self.substrings, substring, word)
+
+        self.cache.clear()
+
+    def lookup(self, word):
+        """
+        Return the set of keys of the items matching `word` (the returned set should not be
+        modified)
+        """
+        if len(word) < SUBSTRING_MIN:
+            return self.prefixes.get(word, frozenset())
+
+        # Find the words of the items containing `word`, starting from the smallest set
+        candidates = sorted([self.substrings.get(substring, frozenset())
+                             for substring in substrings(word)], key=len)
+        words = candidates[0]
+        for other in candidates[1:]:
+            words = words & other
+        if len(word) > SUBSTRING_MIN:
+            words = [item_word for item_word in words if word in item_word]
+
+        if len(words) == 1:
+            for item_word in words:
+                return self.items[item_word]
+
+        results = set()
+        for item_word in words:
+            results.update(self.items[item_word])
+        return results
+
+    def search(self, query):
+        """
+        Return the set of keys of the items matching each word of `query`, or None if it does not
+        contain any word (the returned set should not be modified). The lookups of the words are
+        cached until the index changes, so that only the word being typed is looked up.
+        """
+        words = set(WORD_RE.findall(normalize(query)))
+        if not words:
+            return None
+
+        matches = []
+        for word in words:
+            if word not in self.cache:
+                self.cache[word] = self.lookup(word)
+            matches.append(self.cache[word])
+
+        # Intersect the smallest sets first
+        matches.sort(key=len)
+        results = matches[0]
+        for keys in matches[1:]:
+            if not results:
+                break
+            results = results & keys
+
+        # Only keep the lookups of the words of the last query
+        for word in list(self.cache):
+            if word not in words:
+                del self.cache[word]
+
+        return results
+
+def discard(table, name, key):
+    """
+    Remove `key` from the set `table[name]`, and remove this set if it becomes empty (in which case
+    True is returned)
+    """
+    keys = table[name]
+    keys.discard(key)
+    if not keys:
+        del table[name]
+        return True
+    return False
@@ -27,19 +27,41 @@
 Module handling the playback of the ambient sounds, using pygame
 """
 
-import pygame
-pygame.mixer.init(frequency=48000)
+from __future__ import print_function
 
-import os, json
+import os, sys, time, traceback
+from collections import OrderedDict, Counter
+from multiprocessing.pool import ThreadPool
 from mutagen.oggvorbis import OggVorbis
+from gi.repository import GLib
 
-from constants import SOUNDS_DIRS, PRESETS_DIR
+from constants import SOUNDS_DIRS, PRESETS_DIR, CACHE_DIR, LOOP_CACHE_DIR, SEAMLESS_LOOPS_FILE
+from .cache import MetadataCache, LoopCache
+from .stores import JSONPresetStore
+from .playback import create_engine
+from .loader import Loader
+from .search import SearchIndex
+from .stats import Stats, instrumented
+
+# Number of threads reading the tags of the sound files at startup
+SCAN_WORKERS = 8
+
+# Duration of the fade in and fade out of the sounds, in milliseconds
+FADE_MS = 1000
+
+# Delay between two updates of the volume ramps, in milliseconds
+RAMP_TICK_MS = 40
 
 class SoundInfos(object):
     """
-    Object containing the informations (author, license and url) about a sound
+    Object containing the informations (author, license and url) about a sound, and its sample
+    rate
     """
-    def __init__(self, filename):
+    def __init__(self, filename, values=None):
+        """
+        Create the object, reading the informations from the file unless their `values` are given
+        (as returned by `as_dict`)
+        """
         self.filename = filename
 
         basename = os.path.basename(filename)
@@ -47,14 +69,23 @@ class SoundInfos(object):
         self.license = None
         self.author = None
         self.url = None
+        self.rate = None
 
-        self.read()
+        if values is None:
+            self.read()
+        else:
+            self.name = values["name"]
+            self.license = values["license"]
+            self.author = values["author"]
+            self.url = values["url"]
+            self.rate = values["rate"]
 
     def read(self):
         """
         Read the informations from the ogg vorbis tags
         """
         tags = OggVorbis(self.filename)
+        self.rate = tags.info.sample_rate
 
         try:
             self.name = tags["title"][0]
@@ -76,6 +107,35 @@ class SoundInfos(object):
         except (KeyError, IndexError):
             pass
 
+    def as_dict(self):
+        """
+        Returns the informations as a dictionary
+        """
+        return {
+            "name": self.name,
+            "license": self.license,
+            "author": self.author,
+            "url": self.url,
+            "rate": self.rate
+        }
+
+    @staticmethod
+    def cached(filename, cache):
+        """
+        Returns the informations about a sound, reading them from the ogg vorbis tags only if they
+        are not in the metadata cache, or if the file changed
+        """
+        stat = os.stat(filename)
+        values = cache.get(filename, stat)
+
+        if values is None or "rate" not in values:
+            infos = SoundInfos(filename)
+            cache.set(filename, stat, infos.as_dict())
+        else:
+            infos = SoundInfos(filename, values)
+
+        return infos
+
     def as_html(self):
         """
         Returns a html representation of the informations
@@ -91,49 +151,263 @@ class Sound(object):
     sounds = {}
     master_volume = 100
     muted = True
+    engine = None
+
+    # Maximal memory used by the loaded sounds in bytes (None for no limit), memory currently used
+    # by them, and loaded sounds which are silent (the ones silent for the longest time first)
+    memory_budget = None
+    loaded_bytes = 0
+    silent = OrderedDict()
+
+    # Audible sounds which could not be played because all the channels were used, they are played
+    # when a channel is released (the ones waiting for the longest time first)
+    waiting = OrderedDict()
+
+    # Sounds which have a nonzero volume or are still playing, the only ones affected by the
+    # master volume and by muting
+    active = set()
+
+    # Sounds whose volume is ramping, and id of the timeout updating them
+    ramps = set()
+    ramps_source = None
+
+    # Counter incremented each time the set of sounds changes, allowing the interface to cache
+    # what it derives from it
+    generation = 0
+
+    # Index of the names, authors, licenses and urls of the sounds
+    index = SearchIndex()
 
-    def __init__(self, filename):
+    # (informations, seamless) of every sound file, including the ones overridden by a file with
+    # the same name in a later directory, and the metadata cache they were read from
+    files = {}
+    metadata = None
+
+    # Functions called with the sets of the names of the removed and of the added sounds after the
+    # sound directories changed, and object watching them
+    listeners = []
+    watcher = None
+
+    # Maximal size of the cache of the seamless loop buffers in bytes, which is only created (with
+    # numpy) once a sound should be looped seamlessly
+    loop_cache_size = 512*1024*1024
+    loops_enabled = False
+
+    def __init__(self, filename, infos=None, seamless=False):
         """
-        Create a volume object from an ogg file.
+        Create a volume object from an ogg file (which is played with a crossfaded loop buffer if
+        `seamless` is True).
         """
         self.filename = filename
+        self.seamless = seamless
         self.volume = 0
 
-        self.infos = SoundInfos(filename)
+        # Volume currently applied, which differs from self.volume while it is ramping, and
+        # (initial volume, start time, duration) of the ramp
+        self.level = 0
+        self.ramp = None
+
+        if infos is None:
+            infos = SoundInfos(filename)
+        self.infos = infos
         Sound.sounds[self.infos.name] = self
+        Sound.generation += 1
+        Sound.index.add(infos.name, [infos.name, infos.author, infos.license, infos.url])
 
-        # The pygame.mixer.Sound object (only loaded when necessary)
+        # The player created by the engine (only loaded when necessary, in a worker thread)
         self.sound = None
+        self.loading = False
 
         self.stopped = True
 
-    def set_volume(self, volume=None):
+    @instrumented("Sound.set_volume")
+    def set_volume(self, volume=None, duration=0):
         """
-        Set the volume
+        Set the volume, ramping it from its current value during `duration` seconds
         """
         if volume != None:
-            self.volume = min(max(0, int(volume)), 100)
+            volume = min(max(0, int(volume)), 100)
+            if volume != self.volume:
+                self.volume = volume
+                Preset.schedule_autosave()
+
+            if self.volume > 0:
+                Sound.active.add(self)
+
+            if duration > 0 and self.level != self.volume:
+                self.ramp = (self.level, time.time(), duration)
+                Sound.start_ramp(self)
+                return
+
+            self.ramp = None
+            Sound.ramps.discard(self)
+            self.level = self.volume
 
         if Sound.muted:
             volume = 0
         else:
-            volume = Sound.master_volume*self.volume
+            volume = Sound.master_volume*self.level
 
         if volume == 0:
             if not self.stopped:
                 # The volume is 0 and the sound is still playing : stop it
                 self.stopped = True
-                self.sound.fadeout(1000)
+                self.sound.fadeout(FADE_MS)
+
+                # Release its channel (and the sound itself if the memory budget is exceeded)
+                # once it has faded out
+                GLib.timeout_add(FADE_MS + 100, Sound.on_faded_out)
+
+            if self.sound != None and self not in Sound.silent:
+                Sound.silent[self] = None
+            Sound.waiting.pop(self, None)
         else:
+            Sound.silent.pop(self, None)
+
             if self.sound == None:
-                # The volume isn't 0 and the sound isn't playing : start it
-                self.sound = pygame.mixer.Sound(self.filename)
+                # The volume isn't 0 and the sound isn't loaded : load it in the background, the
+                # current volume will be applied once it is loaded
+                if not self.loading:
+                    self.loading = True
+                    Loader.submit(Sound.load_player, (self.filename, self.seamless),
+                                  self.on_loaded)
+                return
 
             self.sound.set_volume(volume/10000.)
 
             if self.stopped:
-                self.stopped = False
-                self.sound.play(-1, 0, 1000)
+                if self.sound.play(FADE_MS):
+                    self.stopped = False
+                    Sound.waiting.pop(self, None)
+                else:
+                    Sound.waiting[self] = None
+
+    @staticmethod
+    def load_player(filename, seamless):
+        """
+        Load a sound file with the engine (in a worker thread), and return its player
+        """
+        if not Stats.enabled:
+            return Sound.engine.load(filename, seamless)
+
+        start = time.time()
+        player = Sound.engine.load(filename, seamless)
+        Stats.record_load(filename, time.time() - start)
+        return player
+
+    def on_loaded(self, sound, exc_info):
+        """
+        Method called from the main loop once the sound has been loaded
+        """
+        self.loading = False
+
+        if exc_info is not None:
+            traceback.print_exception(*exc_info)
+            return
+
+        if Sound.sounds.get(self.infos.name) is not self:
+            # The sound was removed while it was loading
+            return
+
+        self.sound = sound
+        Sound.loaded_bytes += sound.nbytes
+        self.set_volume()
+
+        Sound.evict()
+
+    def playing(self):
+        """
+        Return True if the sound is playing or fading out
+        """
+        return not self.stopped or (self.sound != None and self.sound.get_busy())
+
+    def remove(self):
+        """
+        Stop the sound and remove it
+        """
+        if self.sound is not None:
+            if not self.stopped:
+                self.sound.fadeout(FADE_MS)
+                GLib.timeout_add(FADE_MS + 100, Sound.on_faded_out)
+            self.unload()
+
+        self.stopped = True
+        Sound.active.discard(self)
+        Sound.ramps.discard(self)
+        Sound.waiting.pop(self, None)
+
+        if Sound.sounds.get(self.infos.name) is self:
+            del Sound.sounds[self.infos.name]
+            Sound.index.remove(self.infos.name)
+        Sound.generation += 1
+
+    def unload(self):
+        """
+        Release the player (it will be loaded again when the sound becomes audible)
+        """
+        Sound.silent.pop(self, None)
+        Sound.loaded_bytes -= self.sound.nbytes
+        self.sound = None
+
+    @staticmethod
+    def on_faded_out():
+        """
+        Method called once a sound has faded out
+        """
+        Sound.engine.shrink()
+
+        # Its channel may be used by a sound waiting for one
+        for sound in list(Sound.waiting):
+            sound.set_volume()
+
+        Sound.evict()
+        return False
+
+    @staticmethod
+    def evict():
+        """
+        Release the silent sounds, starting with the ones which have been silent for the longest
+        time, until the memory used by the loaded sounds fits in the budget
+        """
+        if Sound.memory_budget is not None:
+            for sound in list(Sound.silent):
+                if Sound.loaded_bytes <= Sound.memory_budget:
+                    break
+
+                # The sounds which are fading out will be evicted later
+                if not sound.sound.get_busy():
+                    sound.unload()
+
+    @staticmethod
+    def start_ramp(sound):
+        """
+        Add a sound to the ramping sounds, and start updating them if necessary
+        """
+        Sound.ramps.add(sound)
+        if Sound.ramps_source is None:
+            Sound.ramps_source = GLib.timeout_add(RAMP_TICK_MS, Sound.tick)
+
+    @staticmethod
+    def tick():
+        """
+        Update the volume of all the ramping sounds, return False once all the ramps are finished
+        """
+        now = time.time()
+        for sound in list(Sound.ramps):
+            initial, start, duration = sound.ramp
+            progress = min(1.0, (now - start)/duration)
+            sound.level = initial + (sound.volume - initial)*progress
+
+            if progress == 1.0:
+                sound.ramp = None
+                Sound.ramps.discard(sound)
+
+            sound.set_volume()
+
+        if not Sound.ramps:
+            Sound.ramps_source = None
+            return False
+        return True
 
     @staticmethod
     def set_master_volume(volume):
@@ -141,8 +415,7 @@ class Sound(object):
         Set the master volume
         """
         Sound.master_volume = min(max(0, int(volume)), 100)
-        for sound in Sound.sounds.values():
-            sound.set_volume()
+        Sound.update_active()
 
     @staticmethod
     def set_muted(muted):
@@ -151,8 +424,19 @@ class Sound(object):
         """
         if Sound.muted != muted:
             Sound.muted = muted
-            for sound in Sound.sounds.values():
-                sound.set_volume()
+            Sound.update_active()
+
+    @staticmethod
+    def update_active():
+        """
+        Update the volume of the active sounds, and remove the sounds which are silent and have
+        faded out from the index
+        """
+        for sound in list(Sound.active):
+            sound.set_volume()
+
+            if sound.volume == 0 and not sound.playing():
+                Sound.active.discard(sound)
 
     @staticmethod
     def toggle_muted():
@@ -162,20 +446,204 @@ class Sound(object):
         Sound.set_muted(not Sound.muted)
 
     @staticmethod
-    def load(muted=True):
+    def load(muted=True, engine=None):
         """
         Load the sounds from the sound directories
         """
-        for sound_dir in SOUNDS_DIRS:
-            if os.path.isdir(sound_dir):
-                for filename in os.listdir(sound_dir):
-                    if os.path.splitext(filename)[1] == ".ogg":
-                        Sound(os.path.join(sound_dir, filename))
+        if engine is None:
+            engine = create_engine("pygame")
+        Sound.engine = engine
 
-        pygame.mixer.set_num_channels(len(Sound.sounds))
+        filenames = []
+        for sound_dir in SOUNDS_DIRS:
+            filenames.extend(Sound.list_directory(sound_dir))
+
+        # Read the informations concurrently, but create the sounds in the order of the
+        # directories, so that a sound overrides the ones with the same name in the previous
+        # directories
+        Sound.metadata = MetadataCache(os.path.join(CACHE_DIR, "metadata.json"))
+        seamless = {}
+
+        if filenames:
+            pool = ThreadPool(min(SCAN_WORKERS, len(filenames)))
+            try:
+                infos = pool.map(lambda filename: SoundInfos.cached(filename, Sound.metadata),
+                                 filenames)
+            finally:
+                pool.close()
+                pool.join()
+
+            for filename, sound_infos in zip(filenames, infos):
+                sound_dir = os.path.dirname(filename)
+                if sound_dir not in seamless:
+                    seamless[sound_dir] = Sound.is_seamless(filename)
+
+                Sound.files[filename] = (sound_infos, seamless[sound_dir])
+                Sound(filename, sound_infos, seamless[sound_dir])
+
+        Sound.metadata.save()
+        Sound.enable_loops()
 
         Sound.set_muted(muted)
 
+    @staticmethod
+    def enable_loops():
+        """
+        Create the cache of the seamless loop buffers if it does not exist yet and a sound should
+        be looped seamlessly
+        """
+        if Sound.loops_enabled:
+            return
+
+        for _, seamless in Sound.files.values():
+            if seamless:
+                break
+        else:
+            return
+
+        Sound.loops_enabled = True
+        try:
+            Sound.engine.loop_cache = LoopCache(LOOP_CACHE_DIR, Sound.loop_cache_size)
+        except ImportError as error:
+            print("Warning: {0}, the sounds are not looped seamlessly".format(error),
+                  file=sys.stderr)
+
+    @staticmethod
+    def list_directory(sound_dir):
+        """
+        Return the sorted list of the paths of the sound files of a directory
+        """
+        if not os.path.isdir(sound_dir):
+            return []
+
+        return [os.path.join(sound_dir, filename) for filename in sorted(os.listdir(sound_dir))
+                if os.path.splitext(filename)[1] == ".ogg"]
+
+    @staticmethod
+    def is_seamless(filename):
+        """
+        Return True if a sound file should be played with a seamless loop buffer
+        """
+        return os.path.exists(os.path.join(os.path.dirname(filename), SEAMLESS_LOOPS_FILE))
+
+    @staticmethod
+    def watch():
+        """
+        Watch the sound directories, and update the sounds when their files change
+        """
+        if Sound.watcher is None:
+            from .watcher import DirectoryWatcher
+            Sound.watcher = DirectoryWatcher(SOUNDS_DIRS, Sound.rescan)
+
+    @staticmethod
+    def rescan(paths):
+        """
+        Update the sounds after the files `paths` of the sound directories were added, changed or
+        removed (the files are read in a worker thread)
+        """
+        filenames = set()
+        for path in paths:
+            if os.path.dirname(path) not in SOUNDS_DIRS:
+                continue
+
+            if os.path.basename(path) == SEAMLESS_LOOPS_FILE:
+                # The way all the sounds of the directory are looped changed
+                sound_dir = os.path.dirname(path)
+                filenames.update([filename for filename in Sound.files
+                                  if os.path.dirname(filename) == sound_dir])
+                filenames.update(Sound.list_directory(sound_dir))
+            elif os.path.splitext(path)[1] == ".ogg":
+                filenames.add(path)
+
+        if filenames:
+            Loader.submit(Sound.read_files, (sorted(filenames),), Sound.on_rescanned)
+
+    @staticmethod
+    def read_files(filenames):
+        """
+        Return a list of (filename, informations, seamless) tuples for the sound files
+        `filenames`, the informations being None if the file was removed or cannot be read
+        """
+        files = []
+        for filename in filenames:
+            try:
+                sound_infos = SoundInfos.cached(filename, Sound.metadata)
+            except (IOError, OSError):
+                sound_infos = None
+            except Exception: # pylint: disable=broad-except
+                traceback.print_exc()
+                sound_infos = None
+
+            files.append((filename, sound_infos, Sound.is_seamless(filename)))
+
+        Sound.metadata.save()
+        return files
+
+    @staticmethod
+    def on_rescanned(files, exc_info):
+        """
+        Method called from the main loop once the changed sound files have been read, updating
+        the sounds whose files changed, keeping their volumes
+        """
+        if exc_info is not None:
+            traceback.print_exception(*exc_info)
+            return
+
+        names = set()
+        for filename, sound_infos, seamless in files:
+            if filename in Sound.files:
+                names.add(Sound.files.pop(filename)[0].name)
+            if sound_infos is not None:
+                Sound.files[filename] = (sound_infos, seamless)
+                names.add(sound_infos.name)
+
+        # The sound of each name is the one of the last file in the order of the directories
+        winners = {}
+        for filename, (sound_infos, seamless) in Sound.files.items():
+            if sound_infos.name in names:
+                key = (SOUNDS_DIRS.index(os.path.dirname(filename)), filename)
+                if sound_infos.name not in winners or key > winners[sound_infos.name][0]:
+                    winners[sound_infos.name] = (key, filename)
+
+        changed = set([filename for filename, _, _ in files])
+        removed = set()
+        added = set()
+        for name in names:
+            sound = Sound.sounds.get(name)
+            filename = winners[name][1] if name in winners else None
+
+            if sound is not None and sound.filename == filename and filename not in changed:
+                continue
+
+            volume = 0
+            if sound is not None:
+                volume = sound.volume
+                sound.remove()
+                removed.add(name)
+
+            if filename is not None:
+                sound_infos, seamless = Sound.files[filename]
+                Sound(filename, sound_infos, seamless).set_volume(volume)
+                added.add(name)
+
+        Sound.enable_loops()
+
+        # A sound which was replaced is both in the removed and the added sounds
+        for listener in Sound.listeners:
+            listener(removed - added, added - removed)
+
+    @staticmethod
+    def common_rate():
+        """
+        Return the sample rate of most of the sounds (or None if there are no sounds), so that they
+        do not need to be resampled
+        """
+        rates = Counter([sound.infos.rate for sound in Sound.sounds.values()
+                         if sound.infos.rate is not None])
+        if not rates:
+            return None
+        return rates.most_common(1)[0][0]
+
     @staticmethod
     def sorted():
         """
@@ -192,34 +660,69 @@ class Preset(object):
     presets = {}
     current_preset = None
 
-    def __init__(self, filename):
+    # Duration of the transition between presets, in seconds
+    transition = 2.0
+
+    # Store in which the presets are saved
+    store = None
+
+    # Delay between the last change of a volume and the saving of the current preset in seconds
+    # (None to disable it), time at which it should be saved, and id of the autosave timeout
+    autosave_delay = 5.0
+    autosave_time = None
+    autosave_source = None
+
+    def __init__(self, name):
         """
-        Initialize a preset that will be stored in the file `filename` (without reading or writing
-        the file)
+        Initialize the preset named `name` (without reading or writing it)
         """
-        self.filename = filename
-        self.name = os.path.splitext(os.path.basename(filename))[0]
-        self.volumes = {}
+        self.name = name
+
+        # Volumes of the preset (None until they are read), and modification time of the preset
+        # when they were read
+        self.volumes = None
+        self.mtime = None
 
         if self.name == ".current":
             Preset.current_preset = self
         else:
             Preset.presets[self.name] = self
 
-    def apply(self):
+    @instrumented("Preset.apply")
+    def apply(self, duration=None):
         """
-        Apply the preset
+        Apply the preset, ramping the volumes during `duration` seconds (by default, the duration
+        of the transition between presets). Return False if the preset no longer exists.
         """
-        for name, sound in Sound.sounds.items():
-            if self.volumes.has_key(name):
-                sound.set_volume(self.volumes[name])
-            else:
-                sound.set_volume(0)
+        if duration is None:
+            duration = Preset.transition
+
+        if not self.read():
+            return False
+
+        for sound in list(Sound.active):
+            if sound.infos.name not in self.volumes:
+                sound.set_volume(0, duration)
+
+        for name, volume in self.volumes.items():
+            if name in Sound.sounds:
+                Sound.sounds[name].set_volume(volume, duration)
+
+        return True
 
     def save(self):
         """
         Save the current settings to the preset and write it
         """
+        # Keep the volumes of the sounds which are not available
+        try:
+            if not self.read():
+                # New preset
+                self.volumes = {}
+        except ValueError:
+            # Invalid preset
+            self.volumes = {}
+
         # Get the current settings
         for name, sound in Sound.sounds.items():
             if sound.volume > 0:
@@ -228,35 +731,54 @@ class Preset(object):
                 self.volumes.pop(name)
 
         # Write them
-        if not os.path.exists(os.path.dirname(self.filename)):
-            os.makedirs(os.path.dirname(self.filename))
-        with open(self.filename, "w") as fileobj:
-            json.dump(self.volumes, fileobj)
+        Preset.store.write(self.name, self.volumes)
+        self.mtime = Preset.store.mtime(self.name)
+
+        if self.name != ".current":
+            Preset.presets[self.name] = self
 
     def read(self):
         """
-        Read the preset from the file
+        Read the preset from the store, unless it has already been read and has not been modified
+        since. Return False (and forget the preset) if it was removed outside of the application.
         """
-        with open(self.filename, "r") as fileobj:
-            self.volumes = json.load(fileobj)
+        try:
+            mtime = Preset.store.mtime(self.name)
+            if self.volumes is None or mtime != self.mtime:
+                self.volumes = Preset.store.read(self.name)
+                self.mtime = mtime
+        except (IOError, OSError, KeyError):
+            self.volumes = None
+            self.mtime = None
+            if Preset.presets.get(self.name) is self:
+                del Preset.presets[self.name]
+            return False
+
+        return True
 
     def remove(self):
         """
         Remove the preset
         """
-        os.remove(self.filename)
-        del Preset.presets[self.name]
+        try:
+            Preset.store.remove(self.name)
+        except (IOError, OSError):
+            # Already removed outside of the application
+            pass
+        Preset.presets.pop(self.name, None)
 
     @staticmethod
-    def load(preset_name=None):
+    def load(preset_name=None, store=None):
         """
-        Load the presets from the presets directory
+        Load the names of the presets from the store (by default, the JSON files of the presets
+        directory), the presets themselves are only read when they are applied
         """
-        if os.path.isdir(PRESETS_DIR):
-            for filename in os.listdir(PRESETS_DIR):
-                if os.path.splitext(filename)[1] == ".json":
-                    preset = Preset(os.path.join(PRESETS_DIR, filename))
-                    preset.read()
+        if store is None:
+            store = JSONPresetStore(PRESETS_DIR)
+        Preset.store = store
+
+        for name in store.names():
+            Preset(name)
 
         if preset_name in Preset.presets:
             Preset.presets[preset_name].apply()
@@ -271,21 +793,60 @@ class Preset(object):
         try:
             preset = Preset.presets[name]
         except KeyError:
-            preset = Preset(os.path.join(PRESETS_DIR, name + ".json"))
+            preset = Preset(name)
         preset.save()
 
     @staticmethod
-    def quit():
+    def save_current():
         """
         Save the current preset for next launch
         """
         preset = Preset.current_preset
 
         if preset == None:
-            preset = Preset(os.path.join(PRESETS_DIR, ".current.json"))
+            preset = Preset(".current")
 
         preset.save()
 
+    @staticmethod
+    def schedule_autosave():
+        """
+        Schedule the saving of the current preset, `autosave_delay` seconds after the last change
+        """
+        if Preset.autosave_delay is None or Preset.store is None:
+            return
+
+        Preset.autosave_time = time.time() + Preset.autosave_delay
+        if Preset.autosave_source is None:
+            Preset.autosave_source = GLib.timeout_add(int(Preset.autosave_delay*1000),
+                                                      Preset.on_autosave)
+
+    @staticmethod
+    def on_autosave():
+        """
+        Save the current preset, unless it was changed since the autosave was scheduled
+        """
+        delay = Preset.autosave_time - time.time()
+        if delay > 0:
+            # Wait until `autosave_delay` seconds after the last change
+            Preset.autosave_source = GLib.timeout_add(int(delay*1000) + 1, Preset.on_autosave)
+        else:
+            Preset.autosave_source = None
+            Preset.save_current()
+
+        return False
+
+    @staticmethod
+    def quit():
+        """
+        Save the current preset for next launch
+        """
+        if Preset.autosave_source is not None:
+            GLib.source_remove(Preset.autosave_source)
+            Preset.autosave_source = None
+
+        Preset.save_current()
+
     @staticmethod
     def sorted():
         """
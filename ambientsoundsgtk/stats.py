@@ -0,0 +1,257 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module collecting statistics about the loading of the sounds, the memory and channels they use
+and the latency of the main loop. Nothing is measured until the statistics are enabled.
+"""
+
+from __future__ import print_function
+
+import sys, time, json, functools
+from gi.repository import GLib
+
+from .stores import write_atomic
+
+# Interval between two probes of the latency of the main loop, in milliseconds
+PROBE_MS = 100
+
+# Latency of the main loop above which it is considered stalled, in seconds
+STALL_DELAY = 0.05
+
+def instrumented(name):
+    """
+    Decorator recording the duration of the calls of a function under `name` while the statistics
+    are enabled
+    """
+    def decorator(function):
+        """
+        Wrap the function
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            """
+            Call the function, measuring its duration if the statistics are enabled
+            """
+            if not Stats.enabled:
+                return function(*args, **kwargs)
+
+            start = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                Stats.record_call(name, time.time() - start)
+        return wrapper
+    return decorator
+
+class Stats(object):
+    """
+    Statistics collected while they are enabled
+    """
+
+    enabled = False
+
+    # Time taken to load each sound file (measured in the worker threads)
+    load_times = {}
+
+    # Number of calls, total and maximal durations of the instrumented functions
+    calls = {}
+
+    # Number of volume changes received by the sliders of the interface, and of volume updates
+    # applied after coalescing them (always counted)
+    updates_received = 0
+    updates_applied = 0
+
+    # Expected time of the next probe of the main loop, maximal latency and number of stalls
+    probe_time = None
+    max_latency = 0.0
+    stalls = 0
+
+    # File to which the statistics are periodically written
+    filename = None
+
+    @staticmethod
+    def enable():
+        """
+        Start collecting the statistics
+        """
+        if not Stats.enabled:
+            Stats.enabled = True
+            Stats.probe_time = time.time() + PROBE_MS/1000.
+            GLib.timeout_add(PROBE_MS, Stats.probe)
+
+    @staticmethod
+    def dump_to(filename, interval):
+        """
+        Collect the statistics and write them to `filename` every `interval` seconds
+        """
+        Stats.enable()
+        Stats.filename = filename
+        GLib.timeout_add(int(interval*1000), Stats.dump)
+
+    @staticmethod
+    def record_load(filename, duration):
+        """
+        Record the time taken to load a sound file
+        """
+        Stats.load_times[filename] = duration
+
+    @staticmethod
+    def record_call(name, duration):
+        """
+        Record the duration of a call of an instrumented function
+        """
+        count, total, maximum = Stats.calls.get(name, (0, 0.0, 0.0))
+        Stats.calls[name] = (count + 1, total + duration, max(maximum, duration))
+
+    @staticmethod
+    def probe():
+        """
+        Measure the delay between the expected and the actual time of the call, which is the
+        time the main loop was blocked
+        """
+        now = time.time()
+        latency = max(0.0, now - Stats.probe_time)
+        Stats.max_latency = max(Stats.max_latency, latency)
+        if latency > STALL_DELAY:
+            Stats.stalls += 1
+
+        Stats.probe_time = now + PROBE_MS/1000.
+        return True
+
+    @staticmethod
+    def snapshot():
+        """
+        Return the current statistics as a dictionary
+        """
+        # The sounds module uses this one
+        from .sounds import Sound
+
+        sounds = {}
+        for sound in Sound.sorted():
+            load_time = Stats.load_times.get(sound.filename)
+            if sound.sound is None and load_time is None:
+                continue
+
+            sounds[sound.infos.name] = {
+                "load_time": load_time,
+                "bytes": sound.sound.nbytes if sound.sound is not None else 0,
+                "volume": sound.volume,
+                "playing": sound.playing()
+            }
+
+        engine = Sound.engine
+        if engine is not None and engine.initialized:
+            mixer = {
+                "rate": engine.rate,
+                "channels": engine.channels,
+                "buffer_size": engine.settings[2]
+            }
+            channels = {
+                "pool": engine.pool.size(),
+                "reserved": len(engine.pool.reserved),
+                "max": engine.max_channels
+            }
+        else:
+            mixer = None
+            channels = None
+
+        calls = {}
+        for name, (count, total, maximum) in Stats.calls.items():
+            calls[name] = {"count": count, "total": total, "max": maximum}
+
+        return {
+            "time": time.time(),
+            "sounds": sounds,
+            "loaded_bytes": Sound.loaded_bytes,
+            "active_sounds": len(Sound.active),
+            "mixer": mixer,
+            "channels": channels,
+            "calls": calls,
+            "volume_updates": {
+                "received": Stats.updates_received,
+                "applied": Stats.updates_applied
+            },
+            "main_loop": {"max_latency": Stats.max_latency, "stalls": Stats.stalls}
+        }
+
+    @staticmethod
+    def dump():
+        """
+        Write the statistics to the file
+        """
+        try:
+            write_atomic(Stats.filename, json.dumps(Stats.snapshot(), indent=2, sort_keys=True))
+        except (IOError, OSError) as error:
+            print("Unable to write the statistics: {0}".format(error), file=sys.stderr)
+        return True
+
+    @staticmethod
+    def as_text():
+        """
+        Return the current statistics as text
+        """
+        stats = Stats.snapshot()
+
+        lines = []
+        lines.append("Loaded sounds: {0} ({1:.1f} MB)".format(
+            len([infos for infos in stats["sounds"].values() if infos["bytes"] > 0]),
+            stats["loaded_bytes"]/1048576.))
+        lines.append("Active sounds: {0}".format(stats["active_sounds"]))
+
+        mixer = stats["mixer"]
+        channels = stats["channels"]
+        if mixer is None:
+            lines.append("Mixer: not initialized")
+        else:
+            if mixer["buffer_size"] is None:
+                buffer_size = "default buffer"
+            else:
+                buffer_size = "buffer of {0} frames".format(mixer["buffer_size"])
+            lines.append("Mixer: {0} Hz, {1} channels, {2}".format(mixer["rate"], mixer["channels"],
+                                                                  buffer_size))
+            lines.append("Channels: {0} in the pool, {1} reserved, at most {2}".format(
+                channels["pool"], channels["reserved"], channels["max"]))
+
+        lines.append("Main loop: {0:.1f} ms maximal latency, {1} stalls".format(
+            stats["main_loop"]["max_latency"]*1000, stats["main_loop"]["stalls"]))
+
+        lines.append("Volume updates: {0} applied for {1} changes".format(
+            stats["volume_updates"]["applied"], stats["volume_updates"]["received"]))
+
+        for name, call in sorted(stats["calls"].items()):
+            lines.append("{0}: {1} calls, {2:.2f} ms on average, {3:.2f} ms at most".format(
+                name, call["count"], call["total"]*1000/call["count"], call["max"]*1000))
+
+        lines.append("")
+        for name, infos in sorted(stats["sounds"].items()):
+            if infos["load_time"] is None:
+                load_time = "?"
+            else:
+                load_time = "{0:.0f} ms".format(infos["load_time"]*1000)
+            lines.append("{0}: loaded in {1}, {2:.1f} MB".format(name, load_time,
+                                                                infos["bytes"]/1048576.))
+
+        return "\n".join(lines)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module defining the stores in which the presets are saved
+"""
+
+import os, json, sqlite3
+
+def write_atomic(filename, data):
+    """
+    Write `data` to a file atomically : the data is written to a temporary file which is synced
+    to the disk and renamed, so that the file is never left truncated
+    """
+    tmp_filename = "{0}.{1}.tmp".format(filename, os.getpid())
+    try:
+        with open(tmp_filename, "w") as fileobj:
+            fileobj.write(data)
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+        os.rename(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+    # Sync the directory so that the rename is on the disk too
+    try:
+        dir_fd = os.open(os.path.dirname(filename), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+class JSONPresetStore(object):
+    """
+    Store saving each preset in a JSON file of the presets directory
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, name):
+        """
+        Return the path of the file of the preset `name`
+        """
+        return os.path.join(self.directory, name + ".json")
+
+    def names(self):
+        """
+        Return the names of the presets
+        """
+        if not os.path.isdir(self.directory):
+            return []
+
+        return [os.path.splitext(filename)[0] for filename in os.listdir(self.directory)
+                if os.path.splitext(filename)[1] == ".json"]
+
+    def mtime(self, name):
+        """
+        Return the modification time of the preset `name`
+        """
+        return os.stat(self.path(name)).st_mtime
+
+    def read(self, name):
+        """
+        Return the volumes of the preset `name`
+        """
+        with open(self.path(name), "r") as fileobj:
+            return json.load(fileobj)
+
+    def write(self, name, volumes):
+        """
+        Write the volumes of the preset `name`
+        """
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        write_atomic(self.path(name), json.dumps(volumes))
+
+    def remove(self, name):
+        """
+        Remove the preset `name`
+        """
+        os.remove(self.path(name))
+
+class SQLitePresetStore(object):
+    """
+    Store saving all the presets in a single SQLite database, indexed by their names. The JSON
+    presets of `import_dir` are imported when the database is created.
+    """
+    def __init__(self, filename, import_dir=None):
+        if not os.path.exists(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+
+        self.connection = sqlite3.connect(filename)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS presets "
+                                    "(name TEXT PRIMARY KEY, volumes TEXT NOT NULL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS metadata "
+                                    "(key TEXT PRIMARY KEY, value TEXT)")
+
+        imported = self.connection.execute("SELECT value FROM metadata WHERE key = 'imported'")
+        if import_dir is not None and imported.fetchone() is None:
+            self.import_json(import_dir)
+
+    def import_json(self, directory):
+        """
+        Import the presets saved in the JSON files of `directory`
+        """
+        json_store = JSONPresetStore(directory)
+
+        with self.connection:
+            for name in json_store.names():
+                try:
+                    volumes = json_store.read(name)
+                except (IOError, ValueError):
+                    continue
+
+                self.connection.execute("INSERT OR REPLACE INTO presets VALUES (?, ?)",
+                                        (name, json.dumps(volumes)))
+
+            self.connection.execute("INSERT OR REPLACE INTO metadata VALUES ('imported', ?)",
+                                    (directory,))
+
+    def names(self):
+        """
+        Return the names of the presets
+        """
+        return [row[0] for row in self.connection.execute("SELECT name FROM presets")]
+
+    def mtime(self, name):
+        """
+        Return the version of the database, which changes when it is modified by another
+        connection (the presets modified through this one are saved by the application itself)
+        """
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def read(self, name):
+        """
+        Return the volumes of the preset `name`
+        """
+        row = self.connection.execute("SELECT volumes FROM presets WHERE name = ?",
+                                      (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return json.loads(row[0])
+
+    def write(self, name, volumes):
+        """
+        Write the volumes of the preset `name`
+        """
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO presets VALUES (?, ?)",
+                                    (name, json.dumps(volumes)))
+
+    def remove(self, name):
+        """
+        Remove the preset `name`
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM presets WHERE name = ?", (name,))
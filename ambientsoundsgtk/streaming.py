@@ -0,0 +1,384 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module defining the engines streaming the sounds from their files, using numpy
+"""
+
+import threading, time
+import numpy
+
+from .decoder import Decoder, CachedDecoder, RingBuffer
+from .playback import Engine, MAX_CHANNELS
+
+# Number of frames decoded at once by the stream engines
+CHUNK_FRAMES = 2048
+
+# Number of frames of the blocks queued on the mixer channels by the stream engines
+BLOCK_FRAMES = 4096
+
+# Size of the ring buffer of each stream, in frames
+RING_FRAMES = 4*BLOCK_FRAMES
+
+# Delay between two iterations of the stream engine thread, in seconds
+TICK_DELAY = 0.02
+
+class StreamPlayer(object):
+    """
+    Player decoding its sound file by small chunks into a ring buffer, and queueing them on a
+    mixer channel, so that its memory usage does not depend on the length of the file
+    """
+    def __init__(self, engine, filename, pcm_filename=None):
+        self.engine = engine
+        self.filename = filename
+        self.pcm_filename = pcm_filename
+        self.volume = 1.0
+
+        # Only set while the sound is playing
+        self.decoder = None
+        self.buffer = None
+        self.channel = None
+        self.channel_id = None
+
+        # Gain of the fade envelope, and its variation per frame
+        self.gain = 0.0
+        self.gain_step = 0.0
+
+    def set_volume(self, volume):
+        """
+        Set the volume (between 0 and 1)
+        """
+        with self.engine.lock:
+            self.volume = volume
+            if self.channel is not None:
+                self.channel.set_volume(volume)
+
+    def play(self, fade_ms):
+        """
+        Play the sound in a loop, fading it in. Return False if it cannot be played because all
+        the channels are used.
+        """
+        with self.engine.lock:
+            if self.decoder is None:
+                self.decoder = self.open()
+                self.buffer = RingBuffer(RING_FRAMES, self.engine.channels)
+                self.gain = 0.0
+
+            self.gain_step = self.engine.fade_step(fade_ms)
+            return self.engine.start(self)
+
+    def open(self):
+        """
+        Return a looping decoder for the sound, reading its decoded version from the PCM cache if
+        possible
+        """
+        if self.pcm_filename is not None:
+            try:
+                return CachedDecoder(self.pcm_filename, self.engine.channels, loop=True)
+            except (IOError, OSError, ValueError):
+                # The file has been evicted from the cache
+                self.pcm_filename = None
+
+        return Decoder(self.filename, self.engine.rate, self.engine.channels, loop=True)
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the ring buffer while the sound is playing
+        """
+        return RING_FRAMES*self.engine.channels*4
+
+    def get_busy(self):
+        """
+        Return True if the sound is playing (or fading out)
+        """
+        return self.decoder is not None
+
+    def fadeout(self, fade_ms):
+        """
+        Fade out and stop the sound
+        """
+        with self.engine.lock:
+            self.gain_step = -self.engine.fade_step(fade_ms)
+
+    def fill(self):
+        """
+        Decode chunks of the file while there is room for them in the ring buffer
+        """
+        while self.buffer.space() >= CHUNK_FRAMES:
+            chunk = self.decoder.read(CHUNK_FRAMES)
+            if len(chunk) == 0:
+                break
+            self.buffer.write(chunk)
+
+    def envelope(self, count):
+        """
+        Return the gains of the fade envelope for the next `count` frames
+        """
+        envelope = self.gain + self.gain_step*numpy.arange(1, count + 1, dtype=numpy.float32)
+        numpy.clip(envelope, 0, 1, out=envelope)
+        if count > 0:
+            self.gain = envelope[-1]
+        return envelope
+
+    def faded_out(self):
+        """
+        Return True once the sound has faded out
+        """
+        return self.gain_step < 0 and self.gain == 0
+
+    def feed(self):
+        """
+        Fill the ring buffer and queue the next block on the channel if necessary. Return False
+        once the sound has faded out.
+        """
+        self.fill()
+
+        if self.channel.get_queue() is not None:
+            return True
+
+        block = self.buffer.read(BLOCK_FRAMES)
+        if len(block) == 0:
+            return False
+
+        block *= self.envelope(len(block))[:, numpy.newaxis]
+
+        sound = self.engine.make_sound(block)
+        if self.channel.get_busy():
+            self.channel.queue(sound)
+        else:
+            self.channel.play(sound)
+
+        return not self.faded_out()
+
+    def stop(self):
+        """
+        Release the decoder, the ring buffer and the channel once the sound has faded out (the
+        last blocks queued on the channel are left to finish)
+        """
+        if self.channel_id is not None:
+            self.engine.pool.release(self.channel_id)
+
+        self.decoder.close()
+        self.decoder = None
+        self.buffer = None
+        self.channel = None
+        self.channel_id = None
+
+class StreamEngine(Engine):
+    """
+    Engine streaming the sounds from their files, with a single thread feeding the mixer channels
+    of all the playing sounds
+    """
+    def __init__(self, pcm_cache=None, max_channels=MAX_CHANNELS, loop_cache=None):
+        Engine.__init__(self, pcm_cache, max_channels, loop_cache)
+
+        self.players = []
+        self.thread = None
+
+        # The pygame.sndarray module (imported with pygame)
+        self.sndarray = None
+
+    def load(self, filename, seamless=False):
+        """
+        Return a player for the sound file `filename` (using its seamless loop buffer if
+        `seamless` is True)
+        """
+        self.init()
+        return StreamPlayer(self, filename, self.cached(filename, seamless))
+
+    def fade_step(self, fade_ms):
+        """
+        Return the variation per frame of the gain of a fade lasting `fade_ms` milliseconds
+        """
+        if fade_ms <= 0:
+            return 1.0
+        return 1000.0/(fade_ms*self.rate)
+
+    def init(self):
+        """
+        Initialize the mixer if necessary
+        """
+        with self.lock:
+            if not self.initialized:
+                Engine.init(self)
+
+                import pygame.sndarray
+                self.sndarray = pygame.sndarray
+
+    def make_sound(self, block):
+        """
+        Convert a block of float frames to a pygame.mixer.Sound object (the mixer is expected to
+        use signed 16 bits samples)
+        """
+        samples = (numpy.clip(block, -1, 1)*32767).astype(numpy.int16)
+        if self.channels == 1:
+            samples = samples[:, 0]
+        return self.sndarray.make_sound(numpy.ascontiguousarray(samples))
+
+    def start(self, player):
+        """
+        Start feeding a player (the lock should be held), return False if there is no channel
+        available for it
+        """
+        if player.channel is None:
+            player.channel_id = self.pool.acquire()
+            if player.channel_id is None:
+                # Too many sounds are playing
+                player.stop()
+                return False
+
+            player.channel = self.mixer.Channel(player.channel_id)
+            player.channel.set_volume(player.volume)
+
+        if player not in self.players:
+            self.players.append(player)
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run)
+            self.thread.daemon = True
+            self.thread.start()
+
+        return True
+
+    def run(self):
+        """
+        Feed the playing sounds until all of them have faded out
+        """
+        while True:
+            with self.lock:
+                for player in list(self.players):
+                    if not player.feed():
+                        self.players.remove(player)
+                        player.stop()
+
+                if not self.players:
+                    self.thread = None
+                    return
+
+            time.sleep(TICK_DELAY)
+
+class MixPlayer(StreamPlayer):
+    """
+    Player whose blocks are added to the output of the mix engine
+    """
+    def __init__(self, engine, filename, pcm_filename=None):
+        StreamPlayer.__init__(self, engine, filename, pcm_filename)
+
+        # Volume applied to the last frame mixed
+        self.mixed_volume = None
+
+    def set_volume(self, volume):
+        """
+        Set the volume (between 0 and 1)
+        """
+        with self.engine.lock:
+            self.volume = volume
+
+    def mix(self, output):
+        """
+        Add the next block of the sound to `output`. Return False once the sound has faded out.
+        """
+        self.fill()
+
+        block = self.buffer.read(len(output))
+        if len(block) == 0:
+            return False
+
+        # Ramp the volume from the one of the previous block to avoid clicks
+        if self.mixed_volume is None:
+            self.mixed_volume = self.volume
+        gains = self.envelope(len(block))
+        gains *= numpy.linspace(self.mixed_volume, self.volume, len(block) + 1)[1:]
+        self.mixed_volume = self.volume
+
+        output[:len(block)] += block*gains[:, numpy.newaxis]
+
+        return not self.faded_out()
+
+    def stop(self):
+        """
+        Release the decoder and the ring buffer once the sound has faded out
+        """
+        StreamPlayer.stop(self)
+        self.mixed_volume = None
+
+class MixEngine(StreamEngine):
+    """
+    Engine mixing all the playing sounds in a single stream with numpy, and playing it on a single
+    mixer channel
+    """
+    def load(self, filename, seamless=False):
+        """
+        Return a player for the sound file `filename` (using its seamless loop buffer if
+        `seamless` is True)
+        """
+        self.init()
+        return MixPlayer(self, filename, self.cached(filename, seamless))
+
+    def start(self, player):
+        """
+        Start mixing a player (the lock should be held), the players all share a single channel
+        """
+        if player not in self.players:
+            self.players.append(player)
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run)
+            self.thread.daemon = True
+            self.thread.start()
+
+        return True
+
+    def run(self):
+        """
+        Mix the playing sounds until all of them have faded out
+        """
+        # The output uses a single channel, whatever the number of sounds
+        channel_id = self.pool.acquire()
+        channel = self.mixer.Channel(channel_id)
+        channel.set_volume(1.0)
+
+        while True:
+            with self.lock:
+                if channel.get_queue() is None:
+                    output = numpy.zeros((BLOCK_FRAMES, self.channels), numpy.float32)
+                    for player in list(self.players):
+                        if not player.mix(output):
+                            self.players.remove(player)
+                            player.stop()
+
+                    sound = self.make_sound(output)
+                    if channel.get_busy():
+                        channel.queue(sound)
+                    else:
+                        channel.play(sound)
+
+                if not self.players:
+                    self.pool.release(channel_id)
+                    self.thread = None
+                    return
+
+            time.sleep(TICK_DELAY)
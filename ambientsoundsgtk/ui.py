@@ -27,8 +27,10 @@
 Module handling the interface
 """
 
-from gi.repository import Gtk, Gdk, Gio, GObject
+from bisect import bisect_left
+from gi.repository import Gtk, Gdk, Gio, GObject, GLib, Pango
 from .sounds import Sound, Preset
+from .stats import Stats
 
 from constants import ICON_PATH
 
@@ -36,6 +38,48 @@ Gtk.IconTheme.get_default().append_search_path(ICON_PATH)
 
 Gtk.Window.set_default_icon_name("ambientsounds-gtk")
 
+class VolumeUpdater(object):
+    """
+    Object coalescing the changes of a volume, so that it is updated at most once per frame of
+    `widget` (or once per idle callback while the widget is not mapped), always with its last value
+    """
+    def __init__(self, widget, callback):
+        self.widget = widget
+        self.callback = callback
+        self.pending = False
+        self.value = None
+
+    def push(self, value):
+        """
+        Schedule an update of the volume, unless one is already pending
+        """
+        Stats.updates_received += 1
+        self.value = value
+
+        if not self.pending:
+            self.pending = True
+            if self.widget.get_mapped():
+                self.widget.add_tick_callback(lambda widget, frame_clock: self.update())
+            else:
+                GLib.idle_add(self.update)
+
+    def update(self):
+        """
+        Update the volume with the last value
+        """
+        self.pending = False
+        Stats.updates_applied += 1
+        self.callback(self.value)
+        return False
+
+class ScaleUpdater(VolumeUpdater):
+    """
+    Volume updater coalescing the value-changed signals of a slider
+    """
+    def __init__(self, scale, callback):
+        VolumeUpdater.__init__(self, scale, callback)
+        scale.connect("value-changed", lambda scale: self.push(scale.get_value()))
+
 class StatusIcon(Gtk.StatusIcon):
     """
     Object handling the tray icon
@@ -86,6 +130,7 @@ class MainWindow(Gtk.Window):
         self.set_default_size(380, 500)
         self.set_title("AmbientSounds")
         self.connect("delete-event", self.on_close)
+        self.connect("key-press-event", self.on_key_press)
 
         vbox = Gtk.VBox()
         self.add(vbox)
@@ -96,18 +141,27 @@ class MainWindow(Gtk.Window):
         self.stack = Gtk.Stack()
         vbox.pack_start(self.stack, True, True, 0)
 
+        soundsbox = Gtk.VBox()
+        self.stack.add_named(soundsbox, "sounds")
+
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text("Search by name, author, license or url")
+        self.search_entry.connect("search-changed", self.on_search_changed)
+        soundsbox.pack_start(self.search_entry, False, True, 0)
+
         scrolledwindow = Gtk.ScrolledWindow()
-        self.stack.add_named(scrolledwindow, "sounds")
+        soundsbox.pack_start(scrolledwindow, True, True, 0)
 
-        listbox = Gtk.ListBox()
-        scrolledwindow.add_with_viewport(listbox)
+        self.soundlist = SoundList()
+        scrolledwindow.add(self.soundlist)
+        Sound.listeners.append(self.on_sounds_changed)
 
-        for sound in Sound.sorted():
-            listbox.add(SoundBox(sound))
+        # Only created when they are shown for the first time
+        self.aboutbox = None
+        self.diagnostics = None
 
-        scrolledwindow = Gtk.ScrolledWindow()
-        scrolledwindow.add_with_viewport(AboutBox())
-        self.stack.add_named(scrolledwindow, "about")
+        # Id of the timeout updating the diagnostics view
+        self.diagnostics_source = None
 
         self.savebox = SaveBox()
         self.savebox.connect("saved", self.on_saved)
@@ -125,7 +179,7 @@ class MainWindow(Gtk.Window):
         master.set_draw_value(False)
         master.set_value(Sound.master_volume)
         master.set_tooltip_text("Master volume")
-        master.connect("value-changed", self.on_master_changed)
+        ScaleUpdater(master, self.on_master_changed)
 
         toolitem = Gtk.ToolItem()
         toolitem.add(master)
@@ -205,11 +259,11 @@ class MainWindow(Gtk.Window):
         else:
             self.show_all()
 
-    def on_master_changed(self, scale):
+    def on_master_changed(self, value):
         """
         Change the master volume
         """
-        Sound.set_master_volume(scale.get_value())
+        Sound.set_master_volume(value)
 
     def on_menu_toggled(self, button):
         """
@@ -226,6 +280,54 @@ class MainWindow(Gtk.Window):
         self.back_button.hide()
         self.stack.set_visible_child_name("sounds")
 
+    def on_key_press(self, window, event):
+        """
+        Show the diagnostics view when Ctrl+Shift+D is pressed
+        """
+        modifiers = Gdk.ModifierType.CONTROL_MASK | Gdk.ModifierType.SHIFT_MASK
+        if (event.state & modifiers == modifiers and
+                Gdk.keyval_to_lower(event.keyval) == Gdk.KEY_d):
+            self.show_diagnostics()
+            return True
+        return False
+
+    def show_diagnostics(self):
+        """
+        Show the diagnostics view (the statistics are collected from then on if they were not
+        already), which is updated every second while it is visible
+        """
+        Stats.enable()
+
+        if self.diagnostics is None:
+            self.diagnostics = Gtk.Label()
+            self.diagnostics.set_selectable(True)
+            self.diagnostics.set_xalign(0)
+            self.diagnostics.set_yalign(0)
+            self.diagnostics.set_border_width(10)
+
+            scrolledwindow = Gtk.ScrolledWindow()
+            scrolledwindow.add_with_viewport(self.diagnostics)
+            scrolledwindow.show_all()
+            self.stack.add_named(scrolledwindow, "diagnostics")
+
+        self.back_button.show()
+        self.stack.set_visible_child_name("diagnostics")
+
+        self.update_diagnostics()
+        if self.diagnostics_source is None:
+            self.diagnostics_source = GLib.timeout_add_seconds(1, self.update_diagnostics)
+
+    def update_diagnostics(self):
+        """
+        Update the diagnostics view, return False once it is hidden
+        """
+        if self.stack.get_visible_child_name() != "diagnostics":
+            self.diagnostics_source = None
+            return False
+
+        self.diagnostics.set_text(Stats.as_text())
+        return True
+
     def on_close(self, window, event):
         """
         Hide the window instead of destroying it on closing
@@ -239,8 +341,7 @@ class MainWindow(Gtk.Window):
         """
         preset.apply()
 
-        for soundbox in SoundBox.soundboxes:
-            soundbox.update()
+        self.soundlist.refresh()
 
     def on_remove(self, button, preset):
         """
@@ -263,10 +364,35 @@ class MainWindow(Gtk.Window):
         self.back_button.hide()
         self.stack.set_visible_child_name("sounds")
 
+    def on_sounds_changed(self, removed, added):
+        """
+        Update the list of the sounds and the about view after the sound directories changed
+        """
+        self.soundlist.update_sounds(removed, added)
+        self.soundlist.refresh()
+
+        if self.aboutbox is not None:
+            self.aboutbox.update()
+
+    def on_search_changed(self, entry):
+        """
+        Filter the sounds
+        """
+        self.soundlist.search(entry.get_text())
+
     def on_about(self, button):
         """
         Show the about view
         """
+        if self.aboutbox is None:
+            self.aboutbox = AboutBox()
+            scrolledwindow = Gtk.ScrolledWindow()
+            scrolledwindow.add_with_viewport(self.aboutbox)
+            scrolledwindow.show_all()
+            self.stack.add_named(scrolledwindow, "about")
+        else:
+            self.aboutbox.update()
+
         self.back_button.show()
         self.stack.set_visible_child_name("about")
 
@@ -281,6 +407,11 @@ class AboutBox(Gtk.VBox):
     """
     Box displaying the credits
     """
+
+    # Markup listing the authors of the sounds, and generation of the sounds it was built for
+    credits = None
+    credits_generation = None
+
     def __init__(self):
         Gtk.VBox.__init__(self)
         self.set_border_width(10)
@@ -322,53 +453,219 @@ class AboutBox(Gtk.VBox):
         label.set_xalign(0)
         self.pack_start(label, False, True, 0)
 
-        label = Gtk.Label()
-        label.set_markup("\n".join([sound.infos.as_html() for sound in Sound.sorted()]))
-        label.set_line_wrap(True)
-        label.set_xalign(0)
-        self.pack_start(label, False, True, 0)
+        self.credits_label = Gtk.Label()
+        self.credits_label.set_line_wrap(True)
+        self.credits_label.set_xalign(0)
+        self.pack_start(self.credits_label, False, True, 0)
+
+        self.generation = None
+        self.update()
 
-class SoundBox(Gtk.ListBoxRow):
+    def update(self):
+        """
+        Update the list of the authors of the sounds if the sounds have changed
+        """
+        if self.generation != Sound.generation:
+            self.generation = Sound.generation
+            self.credits_label.set_markup(AboutBox.get_credits())
+
+    @staticmethod
+    def get_credits():
+        """
+        Return the markup listing the authors of the sounds, which is only rebuilt when the sounds
+        change
+        """
+        if AboutBox.credits_generation != Sound.generation:
+            AboutBox.credits = "\n".join([sound.infos.as_html() for sound in Sound.sorted()])
+            AboutBox.credits_generation = Sound.generation
+        return AboutBox.credits
+
+class SoundList(Gtk.TreeView):
     """
-    Box displaying the name of a sound and a slider to change its volume
+    List displaying the name of each sound and a bar to change its volume, backed by a list model
+    so that only the visible rows are rendered
     """
 
-    soundboxes = []
+    # Width of the column containing the names of the sounds
+    NAME_WIDTH = 150
 
-    def __init__(self, sound):
-        Gtk.ListBoxRow.__init__(self)
+    # Variation of the volume when the left or right arrow key is pressed
+    VOLUME_STEP = 5
 
-        self.sound = sound
+    def __init__(self):
+        self.store = Gtk.ListStore(str)
 
-        vbox = Gtk.VBox()
-        vbox.set_border_width(5)
-        vbox.set_spacing(5)
-        self.add(vbox)
+        # Sorted names of the sounds, search query and names of the sounds matching it (None if
+        # there is no query)
+        self.names = []
+        self.query = ""
+        self.matching = None
+        self.filter = self.store.filter_new()
+        self.filter.set_visible_func(self.is_visible)
 
-        label = Gtk.Label(sound.infos.name)
-        label.set_xalign(0)
-        vbox.pack_start(label, False, True, 0)
+        Gtk.TreeView.__init__(self, self.filter)
+        self.set_headers_visible(False)
+        self.set_fixed_height_mode(True)
+
+        cellrenderer = Gtk.CellRendererText()
+        cellrenderer.set_property("ellipsize", Pango.EllipsizeMode.END)
+        column = Gtk.TreeViewColumn("Sound", cellrenderer, text=0)
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        column.set_fixed_width(SoundList.NAME_WIDTH)
+        self.append_column(column)
+
+        cellrenderer = Gtk.CellRendererProgress()
+        cellrenderer.set_property("text", "")
+        self.volume_column = Gtk.TreeViewColumn("Volume", cellrenderer)
+        self.volume_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        self.volume_column.set_expand(True)
+        self.volume_column.set_cell_data_func(cellrenderer, self.volume_data)
+        self.append_column(self.volume_column)
 
-        self.volume = Gtk.HScale.new_with_range(0, 100, 1)
-        self.volume.set_draw_value(False)
-        self.volume.connect("value-changed", self.on_volume_changed)
-        vbox.pack_start(self.volume, False, True, 0)
+        for sound in Sound.sorted():
+            self.names.append(sound.infos.name)
+            self.store.append([sound.infos.name])
 
-        self.update()
+        # Path of the row whose volume is being dragged, and volume updaters of the sounds
+        self.dragged = None
+        self.updaters = {}
 
-        SoundBox.soundboxes.append(self)
+        self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK | Gdk.EventMask.BUTTON_RELEASE_MASK |
+                        Gdk.EventMask.BUTTON1_MOTION_MASK)
+        self.connect("button-press-event", self.on_button_press)
+        self.connect("motion-notify-event", self.on_motion_notify)
+        self.connect("button-release-event", self.on_button_release)
+        self.connect("key-press-event", self.on_key_press)
 
-    def update(self):
+    def volume_data(self, column, cellrenderer, model, treeiter, data=None):
+        """
+        Display the volume of the sound of a row
+        """
+        cellrenderer.set_property("value", Sound.sounds[model.get_value(treeiter, 0)].volume)
+
+    def is_visible(self, model, treeiter, data=None):
+        """
+        Return True if the sound of a row matches the search query
+        """
+        return self.matching is None or model.get_value(treeiter, 0) in self.matching
+
+    def search(self, query):
+        """
+        Only display the sounds matching `query`
+        """
+        self.query = query
+        self.matching = Sound.index.search(query)
+        self.filter.refilter()
+
+    def update_sounds(self, removed, added):
+        """
+        Remove the rows of the `removed` sounds and add the ones of the `added` sounds, keeping the
+        rows sorted
+        """
+        self.dragged = None
+
+        for name in removed:
+            index = bisect_left(self.names, name)
+            del self.names[index]
+            del self.store[index]
+            self.updaters.pop(name, None)
+
+        for name in added:
+            index = bisect_left(self.names, name)
+            self.names.insert(index, name)
+            self.store.insert(index, [name])
+
+        self.search(self.query)
+
+    def refresh(self):
+        """
+        Redraw the visible rows with the volume of their sounds
+        """
+        self.queue_draw()
+
+    def set_volume(self, path, volume):
         """
-        Update the volume
+        Change the volume of the sound of a row (the update is coalesced until the next frame)
         """
-        self.volume.set_value(self.sound.volume)
+        name = self.filter[path][0]
+        try:
+            updater = self.updaters[name]
+        except KeyError:
+            updater = VolumeUpdater(self, self.on_volume_changed)
+            self.updaters[name] = updater
+
+        updater.push((Sound.sounds[name], min(max(0, volume), 100)))
 
-    def on_volume_changed(self, volume):
+    def set_volume_at(self, path, x):
+        """
+        Change the volume of the sound of a row according to a position in the volume column
+        """
+        area = self.get_cell_area(path, self.volume_column)
+        if area.width > 0:
+            self.set_volume(path, 100.*(x - area.x)/area.width)
+
+    def on_volume_changed(self, value):
         """
         Change the volume
         """
-        self.sound.set_volume(volume.get_value())
+        sound, volume = value
+        if Sound.sounds.get(sound.infos.name) is sound:
+            sound.set_volume(volume)
+        self.refresh()
+
+    def on_button_press(self, widget, event):
+        """
+        Start dragging a volume bar
+        """
+        if event.button != 1:
+            return False
+
+        hit = self.get_path_at_pos(int(event.x), int(event.y))
+        if hit is None or hit[1] is not self.volume_column:
+            return False
+
+        self.dragged = hit[0]
+        self.set_cursor(self.dragged, None, False)
+        self.set_volume_at(self.dragged, event.x)
+        return True
+
+    def on_motion_notify(self, widget, event):
+        """
+        Drag a volume bar
+        """
+        if self.dragged is None:
+            return False
+
+        self.set_volume_at(self.dragged, event.x)
+        return True
+
+    def on_button_release(self, widget, event):
+        """
+        Stop dragging a volume bar
+        """
+        if self.dragged is None:
+            return False
+
+        self.dragged = None
+        return True
+
+    def on_key_press(self, widget, event):
+        """
+        Change the volume of the selected sound with the left and right arrow keys
+        """
+        if event.keyval == Gdk.KEY_Left:
+            step = -SoundList.VOLUME_STEP
+        elif event.keyval == Gdk.KEY_Right:
+            step = SoundList.VOLUME_STEP
+        else:
+            return False
+
+        path = self.get_cursor()[0]
+        if path is None:
+            return False
+
+        self.set_volume(path, Sound.sounds[self.filter[path][0]].volume + step)
+        return True
 
 class SaveBox(Gtk.VBox):
     """
@@ -0,0 +1,102 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Module watching the sound directories for changes
+"""
+
+import time
+from gi.repository import Gio, GLib
+
+# Delay without changes after which the changed files are reported, in milliseconds
+SETTLE_MS = 500
+
+class DirectoryWatcher(object):
+    """
+    Object monitoring directories, and reporting the files which were added, changed or removed
+    once no change happened for SETTLE_MS milliseconds, so that a burst of changes (such as the
+    extraction of an archive) is reported in a single batch
+    """
+    def __init__(self, directories, callback):
+        """
+        Watch `directories` (which may not exist yet), calling callback(paths) from the main loop
+        with the set of the paths of the files which changed
+        """
+        self.callback = callback
+        self.paths = set()
+
+        # Time at which the changes are reported, and id of the timeout doing it
+        self.report_time = None
+        self.report_source = None
+
+        self.monitors = []
+        for directory in directories:
+            try:
+                monitor = Gio.File.new_for_path(directory).monitor_directory(
+                    Gio.FileMonitorFlags.WATCH_MOVES, None)
+            except GLib.GError:
+                continue
+
+            monitor.connect("changed", self.on_changed)
+            self.monitors.append(monitor)
+
+    def on_changed(self, monitor, changed_file, other_file, event_type):
+        """
+        Method called when a file of a watched directory changes
+        """
+        self.paths.add(changed_file.get_path())
+        if other_file is not None and event_type == Gio.FileMonitorEvent.RENAMED:
+            self.paths.add(other_file.get_path())
+
+        self.report_time = time.time() + SETTLE_MS/1000.
+        if self.report_source is None:
+            self.report_source = GLib.timeout_add(SETTLE_MS, self.on_settled)
+
+    def on_settled(self):
+        """
+        Report the changed files, unless a file changed since the report was scheduled
+        """
+        delay = self.report_time - time.time()
+        if delay > 0:
+            # Wait until SETTLE_MS milliseconds after the last change
+            self.report_source = GLib.timeout_add(int(delay*1000) + 1, self.on_settled)
+        else:
+            self.report_source = None
+            paths, self.paths = self.paths, set()
+            self.callback(paths)
+
+        return False
+
+    def stop(self):
+        """
+        Stop watching the directories
+        """
+        for monitor in self.monitors:
+            monitor.cancel()
+        self.monitors = []
+
+        if self.report_source is not None:
+            GLib.source_remove(self.report_source)
+            self.report_source = None
@@ -0,0 +1,241 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015 Muges
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation files
+# (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Benchmark of the startup, loading and volume update code paths of AmbientSounds
+
+Synthetic sound and preset directories are generated for each library size, and each size is
+benchmarked in a separate process (so that its peak memory usage is measured independently). The
+audio output is disabled, and the interface benchmarks are skipped if no display is available
+(use xvfb-run to run them on a headless machine).
+"""
+
+from __future__ import print_function
+
+import os, sys, json, time, random, shutil, resource, argparse, platform, subprocess, tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# Default library sizes
+SIZES = [10, 100, 1000, 10000]
+
+# Number of presets generated for each library size, and number of sounds in each preset
+PRESETS = 20
+PRESET_SOUNDS = 5
+
+# Number of repetitions of the fast operations
+REPEAT = 20
+
+def generate_sounds(directory, count):
+    """
+    Generate `count` short tagged ogg files in `directory`
+    """
+    import numpy
+    import soundfile
+    from mutagen.oggvorbis import OggVorbis
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    template = os.path.join(directory, "template.ogg.tmp")
+    noise = numpy.random.uniform(-0.1, 0.1, (4800, 2))
+    soundfile.write(template, noise, 48000, format="OGG", subtype="VORBIS")
+
+    for i in range(count):
+        filename = os.path.join(directory, "sound{0:05d}.ogg".format(i))
+        shutil.copy(template, filename)
+
+        tags = OggVorbis(filename)
+        tags["title"] = u"Sound {0}".format(i)
+        tags["artist"] = u"Author {0}".format(i % 50)
+        tags["copyright"] = u"CC BY 4.0"
+        tags["contact"] = u"http://example.com/sounds/{0}".format(i)
+        tags.save()
+
+    os.remove(template)
+
+def generate_presets(directory, count):
+    """
+    Generate the presets for a library of `count` sounds in `directory`
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    names = [u"Sound {0}".format(i) for i in range(count)]
+    for i in range(PRESETS):
+        volumes = dict((name, random.randint(1, 100))
+                       for name in random.sample(names, min(PRESET_SOUNDS, count)))
+
+        with open(os.path.join(directory, "preset{0}.json".format(i)), "w") as fileobj:
+            json.dump(volumes, fileobj)
+
+def measure(function, repeat=1):
+    """
+    Call `function` `repeat` times, and return the minimal and median durations in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        durations.append(time.time() - start)
+
+    durations.sort()
+    return {"min": durations[0], "median": durations[len(durations)//2]}
+
+def wait_loaded(sounds):
+    """
+    Run the main loop until the sounds are loaded
+    """
+    from gi.repository import GLib
+
+    context = GLib.MainContext.default()
+    while any(sound.loading for sound in sounds):
+        context.iteration(True)
+
+def run_benchmark(workdir, count):
+    """
+    Benchmark a library of `count` sounds in `workdir` (in the current process) and return the
+    results
+    """
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    from ambientsoundsgtk import sounds
+    from ambientsoundsgtk.sounds import Sound, Preset
+
+    sounds.SOUNDS_DIRS[:] = [os.path.join(workdir, "sounds")]
+    sounds.PRESETS_DIR = os.path.join(workdir, "presets")
+    sounds.CACHE_DIR = os.path.join(workdir, "cache")
+    if os.path.exists(sounds.CACHE_DIR):
+        shutil.rmtree(sounds.CACHE_DIR)
+
+    results = {"sounds": count}
+
+    # Loading of the sounds, without and with the metadata cache
+    results["Sound.load (cold cache)"] = measure(lambda: Sound.load(False))
+    Sound.sounds.clear()
+    results["Sound.load (warm cache)"] = measure(lambda: Sound.load(False))
+
+    # Loading of the presets
+    def load_presets():
+        """
+        Reload the presets
+        """
+        Preset.presets.clear()
+        Preset.current_preset = None
+        Preset.load()
+    results["Preset.load"] = measure(load_presets, REPEAT)
+
+    # Application of the presets (without transition, so that the volumes are set immediately),
+    # the sounds being loaded in the background
+    presets = list(Preset.sorted())
+    results["Preset.apply"] = measure(lambda: random.choice(presets).apply(0), REPEAT)
+    wait_loaded(Sound.sounds.values())
+
+    # Master volume
+    results["Sound.set_master_volume"] = measure(
+        lambda: Sound.set_master_volume(random.randint(0, 100)), REPEAT)
+
+    # Interface
+    from gi.repository import Gtk
+    if Gtk.init_check(sys.argv)[0]:
+        from ambientsoundsgtk.ui import MainWindow, AboutBox
+        results["MainWindow"] = measure(MainWindow)
+        results["AboutBox"] = measure(AboutBox)
+    else:
+        results["MainWindow"] = None
+        results["AboutBox"] = None
+
+    # Peak resident memory (in kilobytes on Linux, in bytes on OS X)
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if platform.system() == "Darwin":
+        maxrss //= 1024
+    results["peak_rss_kb"] = maxrss
+
+    return results
+
+def main():
+    """
+    Generate the data and run the benchmarks
+    """
+    parser = argparse.ArgumentParser(description='Benchmark of AmbientSounds')
+    parser.add_argument('--sizes', action='store', default=",".join(str(size) for size in SIZES),
+                        help='comma-separated library sizes (default: %(default)s)')
+    parser.add_argument('--output', action='store', default='benchmark.json',
+                        help='file where the results are written (default: %(default)s)')
+    parser.add_argument('--workdir', action='store',
+                        help='directory of the generated data, which is kept and reused ' +
+                             '(a temporary directory is used by default)')
+    parser.add_argument('--child', action='store', type=int, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.child is not None:
+        results = run_benchmark(args.workdir, args.child)
+        with open(os.path.join(args.workdir, "results.json"), "w") as fileobj:
+            json.dump(results, fileobj)
+        return
+
+    from ambientsoundsgtk.constants import VERSION
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ambientsounds-benchmark-")
+    report = {
+        "version": VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": []
+    }
+
+    try:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            size_dir = os.path.join(workdir, str(size))
+            if not os.path.isdir(os.path.join(size_dir, "sounds")):
+                print("Generating {0} sounds...".format(size), file=sys.stderr)
+                generate_sounds(os.path.join(size_dir, "sounds"), size)
+                generate_presets(os.path.join(size_dir, "presets"), size)
+
+            print("Benchmarking {0} sounds...".format(size), file=sys.stderr)
+            subprocess.check_call([sys.executable, os.path.abspath(__file__),
+                                   "--child", str(size), "--workdir", size_dir])
+            with open(os.path.join(size_dir, "results.json"), "r") as fileobj:
+                results = json.load(fileobj)
+            report["results"].append(results)
+
+            for name, value in sorted(results.items()):
+                if isinstance(value, dict):
+                    print("  {0:<32} {1:10.3f} ms".format(name, value["median"]*1000),
+                          file=sys.stderr)
+            print("  {0:<32} {1:10d} kB".format("peak RSS", results["peak_rss_kb"]),
+                  file=sys.stderr)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir)
+
+    with open(args.output, "w") as fileobj:
+        json.dump(report, fileobj, indent=2, sort_keys=True)
+
+if __name__ == "__main__":
+    main()
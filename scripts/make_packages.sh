@@ -42,6 +42,7 @@ rm "$tmpdir/ambientsounds-gtk/icons/hicolor/16x16/apps/ambientsounds-gtk.xcf"
 
 cp "$appdir/ambientsounds-gtk.desktop" "$tmpdir/ambientsounds-gtk"
 cp "$appdir/ambientsounds-gtk" "$tmpdir/ambientsounds-gtk"
+cp "$appdir/ambientsounds-ctl" "$tmpdir/ambientsounds-gtk"
 cp "$appdir/CHANGELOG.rst" "$tmpdir/ambientsounds-gtk"
 cp "$appdir/COPYING" "$tmpdir/ambientsounds-gtk"
 cp "$appdir/README.rst" "$tmpdir/ambientsounds-gtk"